@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: MusicQueue (IndexedList) contra la cola anterior basada en deque
+
+Uso: DISCORD_TOKEN=x python bench_queue.py [tamaño]
+"""
+
+import random
+import sys
+import timeit
+from collections import deque
+from utils.music_queue import MusicQueue, Song
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+REPEAT = 2_000
+
+
+class DequeQueue:
+    """Lo que hacían !queue / !remove con la cola anterior"""
+
+    def __init__(self):
+        self._queue = deque()
+
+    def add(self, song):
+        self._queue.append(song)
+
+    def page(self, start, count):
+        return list(self._queue)[start : start + count]  # get_queue() + slice
+
+    def get(self, index):
+        return list(self._queue)[index]  # !remove leía el título así
+
+    def pop(self, index):
+        song = list(self._queue)[index]
+        del self._queue[index]
+        return song
+
+    def move(self, src, dst):
+        song = self._queue[src]
+        del self._queue[src]
+        self._queue.insert(dst, song)
+
+    def skip(self):
+        return self._queue.popleft()
+
+
+def fill(queue):
+    for i in range(N):
+        queue.add(Song({"url": f"https://youtu.be/{i:011d}", "title": f"song {i}"}))
+    return queue
+
+
+def bench(name, queue):
+    rnd = random.Random(0)
+    mid = N // 2
+    cases = {
+        "page (mitad)": lambda: queue.page(mid, 10),
+        "get(i)": lambda: queue.get(rnd.randrange(N)),
+        "pop(i) + add": lambda: queue.add(queue.pop(rnd.randrange(N - 1))),
+        "move(src, dst)": lambda: queue.move(rnd.randrange(N), rnd.randrange(N)),
+        "skip + add": lambda: queue.add(queue.skip()),
+    }
+    print(f"\n{name} ({N} canciones)")
+    for label, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=REPEAT, repeat=3))
+        print(f"  {label:<16} {seconds / REPEAT * 1e6:10.2f} µs/op")
+
+
+if __name__ == "__main__":
+    bench("deque (anterior)", fill(DequeQueue()))
+    bench("MusicQueue", fill(MusicQueue()))
@@ -0,0 +1,103 @@
+"""
+Memoria por canción en cola: Song compacto contra el Song anterior
+
+El Song anterior guardaba el discord.Member completo; aquí se simula con un
+objeto con los atributos habituales de un Member, compartido por todas las
+canciones del mismo usuario (como en la realidad).
+
+Uso: DISCORD_TOKEN=x python bench_song.py [canciones_por_servidor] [servidores]
+"""
+
+import sys
+import tracemalloc
+from utils.music_queue import Song
+
+PER_GUILD = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+GUILDS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+USERS_PER_GUILD = 5
+
+
+class OldSong:
+    """Song antes del cambio (diccionario de instancia + Member)"""
+
+    def __init__(self, data: dict):
+        self.url = data.get("url")
+        self.title = data.get("title", "Desconocido")
+        self.duration = data.get("duration", 0)
+        self.thumbnail = data.get("thumbnail")
+        self.requester = data.get("requester")
+        self.webpage_url = data.get("webpage_url")
+
+
+class FakeMember:
+    """Aproximación de un discord.Member (sin contar el caché del servidor)"""
+
+    def __init__(self, user_id: int, guild_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.global_name = f"User {user_id}"
+        self.nick = None
+        self.discriminator = "0"
+        self.avatar = f"a_{user_id:032x}"
+        self.joined_at = "2024-01-01T00:00:00+00:00"
+        self.premium_since = None
+        self.pending = False
+        self.flags = 0
+        self.guild = {"id": guild_id, "name": f"guild{guild_id}"}
+        self._roles = [guild_id + i for i in range(4)]
+        self.activities = ()
+        self._client_status = {None: "online", "desktop": "online"}
+
+
+def entries(guild_id: int):
+    for i in range(PER_GUILD):
+        # Las canciones populares se repiten entre servidores
+        vid = f"{(i * 7 + guild_id) % (PER_GUILD * 2):011d}"
+        # Cadenas nuevas en cada extracción, como llegan de yt-dlp
+        yield {
+            "url": f"https://www.youtube.com/watch?v={vid}",
+            "webpage_url": f"https://www.youtube.com/watch?v={vid}",
+            "title": f"Artista {vid} - Canción {vid} (Official Video)",
+            "duration": 215,
+            "thumbnail": f"https://i.ytimg.com/vi/{vid}/hqdefault.jpg",
+        }, i % USERS_PER_GUILD
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del keep
+    return size
+
+
+def build_old():
+    queues = []
+    for g in range(GUILDS):
+        members = [FakeMember(g * 100 + u, g) for u in range(USERS_PER_GUILD)]
+        queues.append(
+            [OldSong({**data, "requester": members[u]}) for data, u in entries(g)]
+        )
+    return queues
+
+
+def build_new():
+    queues = []
+    for g in range(GUILDS):
+        queues.append(
+            [Song({**data, "requester_id": g * 100 + u}) for data, u in entries(g)]
+        )
+    return queues
+
+
+if __name__ == "__main__":
+    total = PER_GUILD * GUILDS
+    old = measure(build_old)
+    new = measure(build_new)
+    print(f"{total} canciones en {GUILDS} servidores")
+    print(f"  Song anterior: {old / total:8.1f} bytes/canción ({old / 1024:.0f} KiB)")
+    print(f"  Song compacto: {new / total:8.1f} bytes/canción ({new / 1024:.0f} KiB)")
+    print(f"  Reducción:     {(1 - new / old) * 100:8.1f} %")
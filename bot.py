@@ -1,8 +1,15 @@
+import time
+
+_STARTED_AT = time.perf_counter()
+
 import os
 import sys
 import asyncio
 import logging
+import queue
+import signal
 import warnings
+from typing import Optional
 
 # CRÍTICO: Configurar asyncio ANTES de cualquier otro import en Windows
 if sys.platform == "win32":
@@ -27,65 +34,50 @@ logging.getLogger("discord.http").setLevel(logging.WARNING)
 log = logging.getLogger("bot")
 # ─────────────────────────────────────────────────────────────
 
+_imports_at = time.perf_counter()
 import discord
 from discord.ext import commands
 from config import Config
+from utils.startup import PhaseTimer, discover
 
-
-def load_opus():
-    if discord.opus.is_loaded():
-        return True
-
-    candidates = [
-        "/nix/var/nix/profiles/default/lib/libopus.so",
-        "/usr/lib/libopus.so.0",
-        "/usr/lib/x86_64-linux-gnu/libopus.so.0",
-        "libopus.so.0",
-        "libopus",
-        "opus",
-    ]
-
-    for name in candidates:
-        try:
-            discord.opus.load_opus(name)
-            if discord.opus.is_loaded():
-                log.info(f"Opus cargado: {name}")
-                return True
-        except Exception:
-            continue
-
-    log.warning("Opus no cargado — el audio de voz puede no funcionar")
-    return False
-
-
-import subprocess
-
-result = subprocess.run(["which", "ffmpeg"], capture_output=True, text=True)
-log.info(f"ffmpeg path: {result.stdout.strip()}")
-result2 = subprocess.run(
-    ["find", "/nix", "-name", "libopus*", "-type", "f"], capture_output=True, text=True
-)
-log.info(f"libopus paths: {result2.stdout.strip()}")
+startup = PhaseTimer(_STARTED_AT)
+startup.mark("imports", time.perf_counter() - _imports_at)
+discover(startup)
 
 
-load_opus()
+class FlaviBot(commands.AutoShardedBot):
 
-
-class FlaviBot(commands.Bot):
-
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        shard_ids: Optional[list] = None,
+        shard_count: Optional[int] = None,
+        cluster_id: Optional[int] = None,
+        stats_queue=None,
+    ):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.voice_states = True
         intents.guilds = True
 
         super().__init__(
-            command_prefix=Config.PREFIX, intents=intents, help_command=None
+            command_prefix=Config.PREFIX,
+            intents=intents,
+            help_command=None,
+            shard_ids=shard_ids or None,
+            shard_count=shard_count,
         )
+        # Solo cuando lo lanza launcher.py
+        self.cluster_id = cluster_id
+        self.stats_queue = stats_queue
 
     async def setup_hook(self):
         log.info("Configurando bot...")
-        await self.load_cogs()
+        with startup.phase("cogs"):
+            await self.load_cogs()
+        self._connect_started = time.perf_counter()
+        if self.stats_queue is not None:
+            self.loop.create_task(self._report_stats())
 
     async def load_cogs(self):
         cogs_loaded = 0
@@ -100,9 +92,13 @@ class FlaviBot(commands.Bot):
         log.info(f"Cogs cargados: {cogs_loaded}")
 
     async def on_ready(self):
+        if startup.ready():
+            startup.mark("login+gateway", time.perf_counter() - self._connect_started)
+            startup.report()
         log.info(
             f"Bot listo: {self.user} | Prefix: {Config.PREFIX} | Opus: {discord.opus.is_loaded()}"
         )
+        log.info(f"Shards: {sorted(self.shards)} de {self.shard_count}")
         await self.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.listening, name=f"{Config.PREFIX}help"
@@ -117,9 +113,39 @@ class FlaviBot(commands.Bot):
             return
         log.error(f"Error en comando '{ctx.command}': {error}")
 
-
-async def main():
-    bot = FlaviBot()
+    def cluster_stats(self) -> dict:
+        """Resumen de este proceso para el supervisor de launcher.py"""
+        music = self.get_cog("Music")
+        return {
+            "cluster": self.cluster_id,
+            "pid": os.getpid(),
+            "shards": sorted(self.shards),
+            "ready": self.is_ready(),
+            "guilds": len(self.guilds),
+            "voice": len(self.voice_clients),
+            "players": len(music.players) if music else 0,
+            "queued": sum(len(q) for q in music.queues.values()) if music else 0,
+            "latency_ms": self.latency * 1000 if self.is_ready() else None,
+        }
+
+    async def _report_stats(self):
+        while not self.is_closed():
+            try:
+                self.stats_queue.put_nowait(self.cluster_stats())
+            except queue.Full:
+                pass
+            except Exception as e:
+                log.warning(f"No se pudieron enviar estadísticas: {e!r}")
+            await asyncio.sleep(Config.CLUSTER_STATS_INTERVAL)
+
+
+async def main(**bot_kwargs):
+    bot = FlaviBot(**bot_kwargs)
+    if sys.platform != "win32":
+        # launcher.py detiene los clusters con SIGTERM: cerrar limpio
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, lambda: asyncio.ensure_future(bot.close())
+        )
     try:
         await bot.start(Config.TOKEN)
     except KeyboardInterrupt:
@@ -129,5 +155,27 @@ async def main():
             await bot.close()
 
 
+def run_cluster(cluster_id: int, shard_ids: list, shard_count: int, stats_queue):
+    """Punto de entrada de cada proceso hijo de launcher.py"""
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(
+            logging.Formatter(
+                f"%(asctime)s [%(levelname)s] c{cluster_id} %(name)s: %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+    asyncio.run(
+        main(
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            cluster_id=cluster_id,
+            stats_queue=stats_queue,
+        )
+    )
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Proceso único: todos los shards (o SHARD_IDS si se configuró)
+    asyncio.run(
+        main(shard_ids=Config.SHARD_IDS or None, shard_count=Config.SHARD_COUNT)
+    )
@@ -4,6 +4,15 @@ Cog de comandos de administración
 import discord
 from discord.ext import commands
 from config import Config
+from utils.youtube import search_cache, stream_cache, inflight
+from utils.ydl_pool import ydl_pool
+from utils.breaker import profile_breakers
+from utils.scheduler import extraction_scheduler
+from utils.audio_cache import audio_cache
+from utils.timers import idle_timers
+from utils.formats import format_stats
+from utils.notifier import notifier
+from utils.loudness import loudness_cache
 
 class Admin(commands.Cog):
     """Comandos de administración del bot"""
@@ -29,6 +38,203 @@ class Admin(commands.Cog):
             )
             await ctx.send(embed=embed)
     
+    @commands.command(name='stats')
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """Métricas internas de rendimiento (solo owner)"""
+        cache = search_cache.stats()
+        embed = discord.Embed(
+            title="📈 Estadísticas internas",
+            color=Config.COLOR_INFO
+        )
+        embed.add_field(
+            name="Caché de búsquedas",
+            value=(
+                f"```\nEntradas: {cache['size']}/{cache['max_size']}\n"
+                f"Aciertos: {cache['hits']} | Fallos: {cache['misses']}\n"
+                f"Tasa: {cache['hit_rate']:.0%}\n"
+                f"Expiradas: {cache['expirations']} | Desalojadas: {cache['evictions']}\n```"
+            ),
+            inline=False
+        )
+        streams = stream_cache.stats()
+        embed.add_field(
+            name="Caché de URLs de stream",
+            value=(
+                f"```\nEntradas: {streams['size']}/{streams['max_size']}\n"
+                f"Aciertos: {streams['hits']} | Fallos: {streams['misses']}\n"
+                f"Expiradas: {streams['expirations']}\n```"
+            ),
+            inline=False
+        )
+        pool = ydl_pool.stats()
+        idle = ", ".join(f"{k}: {v}" for k, v in pool['idle'].items())
+        embed.add_field(
+            name="Pool yt-dlp",
+            value=(
+                f"```\nLibres: {idle}\n"
+                f"Construidas: {pool['constructed']} "
+                f"(~{pool['avg_construct_ms']:.0f} ms c/u)\n"
+                f"Préstamos: {pool['checkouts']} | Reutilizadas: {pool['reused']}\n"
+                f"Extracciones: {pool['extractions']} "
+                f"(~{pool['avg_extract_ms']:.0f} ms c/u)\n```"
+            ),
+            inline=False
+        )
+        breakers = profile_breakers.stats()
+        if breakers:
+            states = {"closed": "OK", "half_open": "probando", "open": "abierto"}
+            lines = []
+            for name, b in breakers.items():
+                line = f"{name}: {states[b['state']]}"
+                if b['state'] == "open":
+                    line += f" (reintento en {b['retry_in']:.0f}s)"
+                line += f" | ok {b['successes']} | fallos {b['failures']}"
+                lines.append(line)
+            embed.add_field(
+                name="Perfiles yt-dlp",
+                value="```\n" + "\n".join(lines) + "\n```",
+                inline=False
+            )
+        sched = extraction_scheduler.stats()
+        by_priority = ", ".join(f"{k}: {v}" for k, v in sched['depth_by_priority'].items())
+        embed.add_field(
+            name="Extracciones",
+            value=(
+                f"```\nActivas: {sched['active']}/{sched['workers']}\n"
+                f"En cola: {sched['depth']} (máx. {sched['depth_max']})\n"
+                f"{by_priority} | Subidas: {sched['promoted']}\n"
+                f"Espera media: {sched['avg_wait_ms']:.0f} ms | "
+                f"máx.: {sched['max_wait_ms']:.0f} ms\n```"
+            ),
+            inline=False
+        )
+        flights = inflight.stats()
+        embed.add_field(
+            name="Extracciones compartidas",
+            value=(
+                f"```\nEn curso: {flights['inflight']}\n"
+                f"Lanzadas: {flights['started']} | "
+                f"Agrupadas: {flights['coalesced']}\n```"
+            ),
+            inline=False
+        )
+        disk = audio_cache.stats()
+        if disk['enabled']:
+            embed.add_field(
+                name="Caché de audio en disco",
+                value=(
+                    f"```\nArchivos: {disk['files']} | "
+                    f"{disk['bytes'] / 1_048_576:.0f}/{disk['max_bytes'] / 1_048_576:.0f} MB\n"
+                    f"Aciertos: {disk['hits']} | Fallos: {disk['misses']}\n"
+                    f"Escritos: {disk['writes']} | Desalojados: {disk['evictions']}\n```"
+                ),
+                inline=False
+            )
+        formats = format_stats.stats()
+        if formats['tracks']:
+            codecs = ", ".join(f"{k}: {v}" for k, v in formats['by_codec'].items())
+            embed.add_field(
+                name="Formatos de audio",
+                value=(
+                    f"```\nPistas: {formats['tracks']} | {codecs}\n"
+                    f"Sin recodificar: {formats['passthrough']} | "
+                    f"Remuestreadas: {formats['resampled']}\n"
+                    f"Descargado (est.): {formats['download_mb']:.0f} MB | "
+                    f"Exceso medio: {formats['avg_over_target_kbps']:.0f} kbps\n```"
+                ),
+                inline=False
+            )
+        if Config.LOUDNESS_NORMALIZE:
+            loud = loudness_cache.stats()
+            embed.add_field(
+                name="Normalización de sonoridad",
+                value=(
+                    f"```\nVideos medidos: {loud['entries']} (esta sesión: {loud['measured']})\n"
+                    f"Con ganancia: {loud['hits']} | Sin medir: {loud['misses']}\n"
+                    f"Por escribir: {loud['pending']} | Escrituras: {loud['writes']}\n```"
+                ),
+                inline=False
+            )
+        notices = notifier.stats()
+        embed.add_field(
+            name="Avisos de música",
+            value=(
+                f"```\nEnviados: {notices['sent']} | Editados: {notices['edited']}\n"
+                f"Evitados: {notices['coalesced']} | Borrados: {notices['deleted']}\n"
+                f"Fallidos: {notices['failed']} | En cola: {notices['pending']}\n```"
+            ),
+            inline=False
+        )
+        timers = idle_timers.stats()
+        embed.add_field(
+            name="Temporizadores de inactividad",
+            value=f"```\nArmados: {timers['armed']} | Disparados: {timers['fired']}\n```",
+            inline=False
+        )
+        music = self.bot.get_cog('Music')
+        mailboxes = music.mailbox_report() if music else []
+        if mailboxes:
+            lines = []
+            for entry in mailboxes[:5]:
+                guild = self.bot.get_guild(entry['guild_id'])
+                name = guild.name[:18] if guild else str(entry['guild_id'])
+                lines.append(
+                    f"{name}: {entry['depth']} (máx. {entry['depth_max']}) | "
+                    f"{entry['avg_ms']:.0f}/{entry['max_ms']:.0f} ms"
+                )
+            embed.add_field(
+                name="Buzones por servidor (en cola | latencia media/máx.)",
+                value="```\n" + "\n".join(lines) + "\n```",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='memory', aliases=['mem'])
+    @commands.is_owner()
+    async def memory(self, ctx):
+        """Estado en memoria por servidor (solo owner)"""
+        music = self.bot.get_cog('Music')
+        if music is None:
+            embed = discord.Embed(
+                description=f"{Config.EMOJI_ERROR} El cog de música no está cargado",
+                color=Config.COLOR_ERROR
+            )
+            await ctx.send(embed=embed)
+            return
+        report = music.memory_report()
+        live = " | ".join(f"{name}: {count}" for name, count in report['live'].items())
+        
+        embed = discord.Embed(
+            title="🧠 Memoria por servidor",
+            color=Config.COLOR_INFO
+        )
+        embed.add_field(
+            name="Resumen",
+            value=(
+                f"```\nColas: {len(report['guilds'])} | {report['bytes'] / 1024:.1f} KiB\n"
+                f"Vivos: {live}\n"
+                f"Liberados: {report['evicted']} | Ajustes guardados: {report['saved_settings']}\n"
+                f"Plazo: {report['ttl'] // 60} min\n```"
+            ),
+            inline=False
+        )
+        lines = []
+        for entry in report['guilds'][:12]:
+            guild = self.bot.get_guild(entry['guild_id'])
+            name = guild.name[:18] if guild else str(entry['guild_id'])
+            lines.append(
+                f"{name}: {entry['songs']} canc. | {entry['bytes'] / 1024:.1f} KiB | "
+                f"{entry['idle'] / 60:.0f} min"
+            )
+        if lines:
+            embed.add_field(
+                name="Servidores (más pesados primero)",
+                value="```\n" + "\n".join(lines) + "\n```",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+    
     @commands.command(name='shutdown')
     @commands.is_owner()
     async def shutdown(self, ctx):
@@ -71,17 +71,17 @@ class General(commands.Cog):
         )
         embed.add_field(
             name="🎵 Reproducción",
-            value=f"```\n{Config.PREFIX}play <canción>\n{Config.PREFIX}pause\n{Config.PREFIX}resume\n{Config.PREFIX}skip\n{Config.PREFIX}stop\n```",
+            value=f"```\n{Config.PREFIX}play <canción>\n{Config.PREFIX}playmany <a | b | ...>\n{Config.PREFIX}pause\n{Config.PREFIX}resume\n{Config.PREFIX}skip\n{Config.PREFIX}stop\n{Config.PREFIX}seek <tiempo>\n{Config.PREFIX}forward [s]\n{Config.PREFIX}rewind [s]\n```",
             inline=False,
         )
         embed.add_field(
             name="📜 Cola",
-            value=f"```\n{Config.PREFIX}queue\n{Config.PREFIX}nowplaying\n{Config.PREFIX}shuffle\n{Config.PREFIX}remove <pos>\n{Config.PREFIX}clear\n```",
+            value=f"```\n{Config.PREFIX}queue [página]\n{Config.PREFIX}nowplaying\n{Config.PREFIX}shuffle\n{Config.PREFIX}remove <pos>\n{Config.PREFIX}move <de> <a>\n{Config.PREFIX}clear\n```",
             inline=False,
         )
         embed.add_field(
             name="⚙️ Configuración",
-            value=f"```\n{Config.PREFIX}volume <0-100>\n{Config.PREFIX}loop\n{Config.PREFIX}loopqueue\n{Config.PREFIX}join\n{Config.PREFIX}leave\n```",
+            value=f"```\n{Config.PREFIX}volume <0-100>\n{Config.PREFIX}loop\n{Config.PREFIX}loopqueue\n{Config.PREFIX}crossfade <off|0-12>\n{Config.PREFIX}filter <nombre|off>\n{Config.PREFIX}eq <5 valores|off>\n{Config.PREFIX}join\n{Config.PREFIX}leave\n```",
             inline=False,
         )
         embed.set_footer(text="Zero Two v1.0")
@@ -3,15 +3,33 @@ Cog de comandos de música
 """
 
 import logging
+import re
+import time
 import discord
 from discord.ext import commands
 import asyncio
+from functools import partial
 from config import Config
-from utils.music_queue import MusicQueue, Song
-from utils.youtube import YTDLSource
+from utils.music_queue import MusicQueue, Song, format_seconds, parse_seconds
+from utils.youtube import YTDLSource, extract_playlist_id, swap_source
+from utils.prefetch import Prefetcher
+from utils.player import GuildPlayer
+from utils.notifier import notifier
+from utils.loudness import loudness_cache
+from utils.filters import EQ_BANDS, EQ_MAX_DB, PRESETS, FilterChain
+from utils.ydl_pool import ydl_pool
+from utils.scheduler import Priority
+from utils.timers import state_timers
+from utils.indexed_list import IndexedList
+from utils.memory import deep_sizeof, live_objects
 
 log = logging.getLogger("music")
 
+QUEUE_PAGE_SIZE = 10
+
+# Ajustes de una cola recién creada: solo se guardan los que difieren
+_DEFAULT_SETTINGS = (Config.DEFAULT_VOLUME, None, FilterChain())
+
 
 class Music(commands.Cog):
     """Comandos de música del bot"""
@@ -20,16 +38,182 @@ class Music(commands.Cog):
         self.bot = bot
         self.queues: dict[int, MusicQueue] = {}
         self.connecting: set[int] = set()
+        self.prefetchers: dict[int, Prefetcher] = {}
+        self.players: dict[int, GuildPlayer] = {}
+
+        # Servidores sin actividad: su estado se libera tras GUILD_STATE_TTL
+        self.last_active: dict[int, float] = {}
+        self.saved_settings: dict[int, tuple] = {}  # (volumen, crossfade, filtros)
+        self.evicted = 0
+
+    async def cog_load(self):
+        # Precalentar el pool de yt-dlp sin bloquear el arranque
+        self.bot.loop.create_task(self._warm_ydl_pool())
+
+    async def cog_unload(self):
+        for guild_id in self.last_active:
+            state_timers.cancel(guild_id)
+        for player in self.players.values():
+            player.close()
+        for prefetcher in self.prefetchers.values():
+            prefetcher.cancel()
+        # Medidas de sonoridad aún sin escribir
+        await self.bot.loop.run_in_executor(None, loudness_cache.flush)
+
+    async def _warm_ydl_pool(self):
+        # Después de on_ready: importar yt_dlp no compite con el login
+        await self.bot.wait_until_ready()
+        try:
+            await self.bot.loop.run_in_executor(None, ydl_pool.warm)
+        except Exception as e:
+            log.warning(f"No se pudo precalentar el pool de yt-dlp: {e}")
 
     # ──────────────────────────────────────────
     # MÉTODOS INTERNOS
     # ──────────────────────────────────────────
 
     def get_queue(self, ctx) -> MusicQueue:
-        """Obtiene (o crea) la cola del servidor"""
-        if ctx.guild.id not in self.queues:
-            self.queues[ctx.guild.id] = MusicQueue()
-        return self.queues[ctx.guild.id]
+        """Obtiene (o crea) la cola del servidor y renueva su plazo de inactividad"""
+        guild_id = ctx.guild.id
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = MusicQueue()
+            saved = self.saved_settings.pop(guild_id, None)
+            if saved:
+                queue.volume, queue.crossfade, queue.filters = saved
+        self._touch(guild_id)
+        return queue
+
+    def get_prefetcher(self, ctx) -> Prefetcher:
+        """Obtiene (o crea) el precargador del servidor"""
+        if ctx.guild.id not in self.prefetchers:
+            self.prefetchers[ctx.guild.id] = Prefetcher(
+                self.get_queue(ctx), guild_id=ctx.guild.id, loop=self.bot.loop
+            )
+        return self.prefetchers[ctx.guild.id]
+
+    def get_player(self, ctx) -> GuildPlayer:
+        """Obtiene (o crea) el reproductor del servidor"""
+        if ctx.guild.id not in self.players:
+            self.players[ctx.guild.id] = GuildPlayer(
+                self.get_queue(ctx),
+                self.get_prefetcher(ctx),
+                guild_id=ctx.guild.id,
+                loop=self.bot.loop,
+                announce=self._announce_now_playing,
+            )
+            self.players[ctx.guild.id].ctx = ctx
+        return self.players[ctx.guild.id]
+
+    def mailbox_report(self) -> list[dict]:
+        """Buzón de cada servidor: profundidad y latencia de comandos (!stats)"""
+        report = [
+            {"guild_id": guild_id, **player.stats()}
+            for guild_id, player in self.players.items()
+        ]
+        report.sort(key=lambda r: (r["depth"], r["max_ms"]), reverse=True)
+        return report
+
+    def _touch(self, guild_id: int):
+        self.last_active[guild_id] = time.monotonic()
+        state_timers.arm(
+            guild_id, Config.GUILD_STATE_TTL, partial(self._evict_if_idle, guild_id)
+        )
+
+    def _evict_if_idle(self, guild_id: int):
+        """Plazo de state_timers: libera el servidor si ya no está en voz"""
+        guild = self.bot.get_guild(guild_id)
+        vc = guild.voice_client if guild else None
+        if (vc is not None and vc.is_connected()) or guild_id in self.connecting:
+            self._touch(guild_id)  # sigue sonando: volver a mirar más tarde
+            return
+        queue = self.queues.get(guild_id)
+        songs = len(queue) if queue is not None else 0
+        self._release(guild_id, keep_settings=True)
+        self.evicted += 1
+        log.info(f"Estado liberado por inactividad: {guild_id} ({songs} en cola)")
+
+    def _release(self, guild_id: int, *, keep_settings: bool):
+        """Suelta cola, precarga y reproductor; get_queue los recrea"""
+        queue = self.queues.pop(guild_id, None)
+        if not keep_settings:
+            self.saved_settings.pop(guild_id, None)
+        elif queue is not None:
+            settings = (queue.volume, queue.crossfade, queue.filters)
+            if settings != _DEFAULT_SETTINGS:
+                self.saved_settings[guild_id] = settings
+
+        self._cancel_prefetch(guild_id)
+        self.prefetchers.pop(guild_id, None)
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.close()
+        self.connecting.discard(guild_id)
+        self.last_active.pop(guild_id, None)
+        state_timers.cancel(guild_id)
+        notifier.forget(guild_id)
+
+    def memory_report(self) -> dict:
+        """Colas vivas y bytes aproximados por servidor (para !memory)"""
+        now = time.monotonic()
+        classes = (MusicQueue, IndexedList, Song, FilterChain)
+        guilds = [
+            {
+                "guild_id": guild_id,
+                "songs": len(queue) + (1 if queue.current else 0),
+                "bytes": deep_sizeof(queue, classes=classes),
+                "idle": now - self.last_active.get(guild_id, now),
+                "player": guild_id in self.players,
+            }
+            for guild_id, queue in self.queues.items()
+        ]
+        guilds.sort(key=lambda g: g["bytes"], reverse=True)
+        return {
+            "guilds": guilds,
+            "bytes": sum(g["bytes"] for g in guilds),
+            # Más instancias vivas que servidores en self.queues = fuga
+            "live": live_objects((MusicQueue, Prefetcher, GuildPlayer, Song)),
+            "saved_settings": len(self.saved_settings),
+            "evicted": self.evicted,
+            "ttl": Config.GUILD_STATE_TTL,
+        }
+
+    def _enqueue(self, ctx, songs: list[Song]) -> tuple[int, bool]:
+        """
+        Agrega songs y arranca el reproductor si estaba parado. Va por el
+        buzón (GuildPlayer.call): la comprobación y el arranque no se cruzan
+        con el fin de la canción ni con otro !play.
+        Devuelve (posición de la última, si arrancó).
+        """
+        queue = self.get_queue(ctx)
+        position = 0
+        for song in songs:
+            position = queue.add(song)
+        vc = ctx.voice_client
+        if vc and not (vc.is_playing() or vc.is_paused() or queue.current):
+            self.get_player(ctx).wake(ctx)
+            return position, True
+        self._refresh_prefetch(ctx)
+        return position, False
+
+    def _clear_guild(self, guild_id: int):
+        """Vacía la cola y abandona precarga y carga en curso (en el buzón)"""
+        queue = self.queues.get(guild_id)
+        if queue is not None:
+            queue.clear()
+        self._cancel_prefetch(guild_id)
+        player = self.players.get(guild_id)
+        if player:
+            player.cancel_load()
+
+    def _refresh_prefetch(self, ctx):
+        """Rehace la precarga (y la siguiente fuente gapless) tras un cambio en la cola"""
+        self.get_player(ctx).refresh()
+
+    def _cancel_prefetch(self, guild_id: int):
+        prefetcher = self.prefetchers.get(guild_id)
+        if prefetcher:
+            prefetcher.cancel()
 
     async def _connect(self, ctx) -> bool:
         """Conecta el bot al canal de voz del autor."""
@@ -71,88 +255,20 @@ class Music(commands.Cog):
             await ctx.send(f"{Config.EMOJI_ERROR} No pude conectarme al canal")
             return False
 
-    async def play_next(self, ctx):
-        """Reproduce la siguiente canción de la cola"""
-        queue = self.get_queue(ctx)
-
-        if not ctx.voice_client or not ctx.voice_client.is_connected():
-            log.info("play_next: bot no conectado, abortando")
-            queue.current = None
-            return
-
-        # Cola vacía → esperar y desconectar por inactividad
-        if queue.is_empty() and not queue.current:
-            await asyncio.sleep(Config.INACTIVITY_TIMEOUT)
-            if (
-                queue.is_empty()
-                and ctx.voice_client
-                and ctx.voice_client.is_connected()
-                and not ctx.voice_client.is_playing()
-            ):
-                await ctx.send(
-                    f"{Config.EMOJI_INFO} Cola vacía. Desconectando por inactividad..."
-                )
-                await ctx.voice_client.disconnect()
-            return
-
-        next_song = queue.next()
-        if not next_song:
-            return
-
-        try:
-            source = await YTDLSource.from_url(
-                next_song.url, loop=self.bot.loop, stream=True
-            )
-
-            def after_playing(error):
-                if error:
-                    log.error(f"after_playing: {error}")
-                # Limpiar current para que el siguiente play_next funcione bien
-                queue.current = next_song  # mantener hasta que inicie el siguiente
-                if ctx.voice_client and ctx.voice_client.is_connected():
-                    fut = asyncio.run_coroutine_threadsafe(
-                        self.play_next(ctx), self.bot.loop
-                    )
-                    try:
-                        fut.result(timeout=15)
-                    except Exception as e:
-                        log.error(f"after_playing fut.result: {e}")
-
-            if not ctx.voice_client or not ctx.voice_client.is_connected():
-                log.info("Conexión perdida antes de reproducir")
-                return
-
-            ctx.voice_client.play(source, after=after_playing)
-
-            embed = discord.Embed(
-                title=f"{Config.EMOJI_PLAY} Reproduciendo",
-                description=f"**[{next_song.title}]({next_song.webpage_url})**",
-                color=Config.COLOR_MUSIC,
-            )
-            embed.add_field(
-                name="Duración", value=next_song.format_duration(), inline=True
-            )
-            embed.add_field(
-                name="Solicitado por", value=next_song.requester.mention, inline=True
-            )
-            if next_song.thumbnail:
-                embed.set_thumbnail(url=next_song.thumbnail)
-            await ctx.send(embed=embed)
-
-        except discord.errors.ClientException as e:
-            if "Not connected to voice" in str(e):
-                await ctx.send(
-                    f"{Config.EMOJI_ERROR} Me desconectaron del canal. Usa `!join`."
-                )
-            else:
-                log.error(f"ClientException en play_next: {e}")
-            queue.current = None
-        except Exception as e:
-            log.error(f"play_next error: {e}")
-            await ctx.send(f"{Config.EMOJI_ERROR} Error al reproducir, saltando...")
-            queue.current = None
-            await asyncio.sleep(1)
-            await self.play_next(ctx)
+    async def _announce_now_playing(self, ctx, song: Song):
+        """Embed de "Reproduciendo" (lo llama GuildPlayer al empezar cada canción)"""
+        embed = discord.Embed(
+            title=f"{Config.EMOJI_PLAY} Reproduciendo",
+            description=f"**[{song.title}]({song.webpage_url})**",
+            color=Config.COLOR_MUSIC,
+        )
+        embed.add_field(name="Duración", value=song.format_duration(), inline=True)
+        embed.add_field(
+            name="Solicitado por", value=song.requester_mention, inline=True
+        )
+        if song.thumbnail:
+            embed.set_thumbnail(url=song.thumbnail)
+        notifier.now_playing(ctx.guild.id, ctx.channel, embed)
 
     # ──────────────────────────────────────────
     # COMANDOS DE CONEXIÓN
@@ -177,8 +293,12 @@ class Music(commands.Cog):
             await ctx.send(f"{Config.EMOJI_ERROR} No estoy en un canal de voz")
             return
 
-        self.get_queue(ctx).clear()
-        await ctx.voice_client.disconnect()
+        async def leave():
+            self._clear_guild(ctx.guild.id)
+            if ctx.voice_client:
+                await ctx.voice_client.disconnect()
+
+        await self.get_player(ctx).call(leave)
         await ctx.send(f"{Config.EMOJI_SUCCESS} Desconectado del canal de voz")
 
     # ──────────────────────────────────────────
@@ -196,55 +316,210 @@ class Music(commands.Cog):
             if not await self._connect(ctx):
                 return
 
-        search_msg = await ctx.send(f"{Config.EMOJI_LOADING} Buscando: **{search}**...")
+        if extract_playlist_id(search):
+            search_msg = await ctx.send(
+                f"{Config.EMOJI_LOADING} Buscando: **{search}**..."
+            )
+            await self._play_playlist(ctx, search, search_msg)
+            return
 
-        data = await YTDLSource.search(search, loop=self.bot.loop)
+        queue = self.get_queue(ctx)
+        idle = not ctx.voice_client.is_playing() and not queue.current
+        lookup = asyncio.ensure_future(
+            YTDLSource.search(
+                search,
+                guild_id=ctx.guild.id,
+                priority=Priority.PLAY_NOW if idle else Priority.ENQUEUE,
+            )
+        )
+        # Aciertos de caché y búsquedas rápidas no gastan un mensaje
+        search_msg = None
+        try:
+            data = await asyncio.wait_for(
+                asyncio.shield(lookup), Config.SEARCH_NOTICE_DELAY
+            )
+        except asyncio.TimeoutError:
+            search_msg = await ctx.send(
+                f"{Config.EMOJI_LOADING} Buscando: **{search}**..."
+            )
+            data = await lookup
 
         if not data:
-            await search_msg.edit(
-                content=f"{Config.EMOJI_ERROR} No se encontró: **{search}**"
-            )
+            error = f"{Config.EMOJI_ERROR} No se encontró: **{search}**"
+            if search_msg:
+                await search_msg.edit(content=error)
+            else:
+                await ctx.send(error)
             return
 
-        song = Song(
+        song = self._song_from_data(ctx, data)
+        position, started = await self.get_player(ctx).call(self._enqueue, ctx, [song])
+        if started:
+            if search_msg:
+                await search_msg.delete()
+        else:
+            notifier.queued(ctx.guild.id, ctx.channel, song, position, search_msg)
+
+    @staticmethod
+    def _song_from_data(ctx, data: dict) -> Song:
+        return Song(
             {
-                "url": data.get("url") or data.get("webpage_url"),
+                # URL de la página: la URL de stream vive en la caché de youtube.py
+                "url": data.get("webpage_url") or data.get("url"),
                 "title": data.get("title", "Sin título"),
                 "duration": data.get("duration", 0),
                 "thumbnail": data.get("thumbnail"),
                 "webpage_url": data.get("webpage_url"),
-                "requester": ctx.author,
+                "requester_id": ctx.author.id,
             }
         )
 
+    @commands.command(name="playmany", aliases=["pm"])
+    async def playmany(self, ctx, *, searches: str):
+        """Encola varias canciones a la vez (separadas por | o saltos de línea)"""
+        if not ctx.author.voice:
+            await ctx.send(f"{Config.EMOJI_ERROR} Debes estar en un canal de voz")
+            return
+
+        queries = [q.strip() for q in re.split(r"[|\n]", searches) if q.strip()]
+        if not queries:
+            await ctx.send(f"{Config.EMOJI_ERROR} No hay nada que buscar")
+            return
+        if len(queries) > Config.BATCH_MAX:
+            await ctx.send(
+                f"{Config.EMOJI_ERROR} Máximo {Config.BATCH_MAX} canciones por lote"
+            )
+            return
+
+        if not ctx.voice_client or not ctx.voice_client.is_connected():
+            if not await self._connect(ctx):
+                return
+
+        status = await ctx.send(
+            f"{Config.EMOJI_LOADING} Buscando **{len(queries)}** canciones..."
+        )
         queue = self.get_queue(ctx)
-        position = queue.add(song)
-
-        # Si no hay nada reproduciéndose Y no hay canción actual → reproducir
-        if (
-            not ctx.voice_client.is_playing()
-            and not ctx.voice_client.is_paused()
-            and not queue.current
-        ):
-            await search_msg.delete()
-            await self.play_next(ctx)
-        else:
-            embed = discord.Embed(
-                title=f"{Config.EMOJI_QUEUE} Agregado a la cola",
-                description=f"**[{song.title}]({song.webpage_url})**",
-                color=Config.COLOR_INFO,
+        player = self.get_player(ctx)
+        idle = not ctx.voice_client.is_playing() and not queue.current
+        limit = asyncio.Semaphore(Config.BATCH_CONCURRENCY)
+
+        # Los resultados llegan en cualquier orden; se encola el prefijo ya
+        # resuelto para respetar el orden pedido sin esperar al lote entero
+        results: list = [None] * len(queries)
+        done = [False] * len(queries)
+        added: list[Song] = []
+        failed: list[str] = []
+        cursor = 0
+
+        async def resolve(index: int, query: str):
+            async with limit:
+                try:
+                    return await YTDLSource.search(
+                        query,
+                        guild_id=ctx.guild.id,
+                        priority=(
+                            Priority.PLAY_NOW
+                            if idle and index == 0
+                            else Priority.ENQUEUE
+                        ),
+                    )
+                except Exception as e:
+                    log.warning(f"playmany: falló '{query}': {e}")
+                    return None
+
+        def flush():
+            nonlocal cursor
+            while cursor < len(queries) and done[cursor]:
+                data = results[cursor]
+                if not data:
+                    failed.append(queries[cursor])
+                elif len(queue) >= Config.MAX_QUEUE_SIZE:
+                    failed.append(f"{queries[cursor]} (cola llena)")
+                else:
+                    song = self._song_from_data(ctx, data)
+                    self._enqueue(ctx, [song])  # suena ya la primera
+                    added.append(song)
+                cursor += 1
+
+        async def run(index: int, query: str):
+            results[index] = await resolve(index, query)
+            done[index] = True
+            await player.call(flush)
+
+        await asyncio.gather(*(run(i, q) for i, q in enumerate(queries)))
+
+        embed = discord.Embed(
+            title=f"{Config.EMOJI_QUEUE} {len(added)}/{len(queries)} canciones agregadas",
+            color=Config.COLOR_INFO if added else Config.COLOR_ERROR,
+        )
+        if added:
+            lines = [f"`{i + 1}.` {song.title}" for i, song in enumerate(added[:10])]
+            if len(added) > 10:
+                lines.append(f"... y {len(added) - 10} más")
+            embed.description = "\n".join(lines)
+        if failed:
+            embed.add_field(
+                name=f"{Config.EMOJI_ERROR} No encontradas",
+                value="\n".join(f"• {q[:80]}" for q in failed[:10]),
+                inline=False,
             )
-            embed.add_field(name="Posición", value=f"#{position}", inline=True)
-            embed.add_field(name="Duración", value=song.format_duration(), inline=True)
-            if song.thumbnail:
-                embed.set_thumbnail(url=song.thumbnail)
-            await search_msg.edit(content=None, embed=embed)
+        await status.edit(content=None, embed=embed)
+
+    async def _play_playlist(self, ctx, url: str, search_msg):
+        """
+        Encola una playlist con una sola petición plana. Cada Song queda sin
+        resolver: el stream se extrae cuando se acerca a la cabeza de la cola
+        (Prefetcher) o al reproducirse.
+        """
+        queue = self.get_queue(ctx)
+        space = Config.MAX_QUEUE_SIZE - len(queue)
+        if space <= 0:
+            await search_msg.edit(
+                content=f"{Config.EMOJI_ERROR} La cola está llena ({Config.MAX_QUEUE_SIZE} canciones)"
+            )
+            return
+
+        idle = not ctx.voice_client.is_playing() and not queue.current
+        playlist = await YTDLSource.playlist(
+            url,
+            limit=space,
+            guild_id=ctx.guild.id,
+            priority=Priority.PLAY_NOW if idle else Priority.ENQUEUE,
+        )
+        if not playlist or not playlist["entries"]:
+            await search_msg.edit(
+                content=f"{Config.EMOJI_ERROR} No se pudo leer la playlist"
+            )
+            return
+
+        songs = [
+            Song({**entry, "requester_id": ctx.author.id})
+            for entry in playlist["entries"]
+        ]
+        await self.get_player(ctx).call(self._enqueue, ctx, songs)
+
+        embed = discord.Embed(
+            title=f"{Config.EMOJI_QUEUE} Playlist agregada",
+            description=f"**[{playlist['title']}]({url})**",
+            color=Config.COLOR_INFO,
+        )
+        embed.add_field(
+            name="Canciones", value=str(len(playlist["entries"])), inline=True
+        )
+        await search_msg.edit(content=None, embed=embed)
 
     @commands.command(name="pause")
     async def pause(self, ctx):
         """Pausa la reproducción"""
-        if ctx.voice_client and ctx.voice_client.is_playing():
-            ctx.voice_client.pause()
+
+        def pause():
+            vc = ctx.voice_client
+            if vc and vc.is_playing():
+                vc.pause()
+                return True
+            return False
+
+        if await self.get_player(ctx).call(pause):
             await ctx.send(f"{Config.EMOJI_PAUSE} Música pausada")
         else:
             await ctx.send(f"{Config.EMOJI_ERROR} No hay nada reproduciéndose")
@@ -252,8 +527,15 @@ class Music(commands.Cog):
     @commands.command(name="resume")
     async def resume(self, ctx):
         """Reanuda la reproducción"""
-        if ctx.voice_client and ctx.voice_client.is_paused():
-            ctx.voice_client.resume()
+
+        def resume():
+            vc = ctx.voice_client
+            if vc and vc.is_paused():
+                vc.resume()
+                return True
+            return False
+
+        if await self.get_player(ctx).call(resume):
             await ctx.send(f"{Config.EMOJI_PLAY} Música reanudada")
         else:
             await ctx.send(f"{Config.EMOJI_ERROR} La música no está pausada")
@@ -261,24 +543,45 @@ class Music(commands.Cog):
     @commands.command(name="skip", aliases=["s"])
     async def skip(self, ctx):
         """Salta la canción actual (ignora el modo loop)"""
-        if not ctx.voice_client or (
-            not ctx.voice_client.is_playing() and not ctx.voice_client.is_paused()
-        ):
+
+        player = self.get_player(ctx)
+
+        def skip():
+            vc = ctx.voice_client
+            if not vc:
+                return False
+            if player.loading:
+                # Aún cargando: se abandona la carga y se pasa a la siguiente
+                self.get_queue(ctx).loop = False
+                player.cancel_load()
+                player.wake(ctx)
+                return True
+            if not (vc.is_playing() or vc.is_paused()):
+                return False
+            self.get_queue(ctx).loop = False  # ignorar loop al saltar
+            self._refresh_prefetch(ctx)
+            vc.stop()  # el fin de canción llega como otra carta, detrás de esta
+            return True
+
+        if not await player.call(skip):
             await ctx.send(f"{Config.EMOJI_ERROR} No hay nada reproduciéndose")
             return
-
-        queue = self.get_queue(ctx)
-        queue.loop = False  # ignorar loop al saltar
-        ctx.voice_client.stop()
         await ctx.send(f"{Config.EMOJI_SKIP} Canción saltada")
 
     @commands.command(name="stop")
     async def stop(self, ctx):
         """Detiene la reproducción, limpia la cola y desconecta"""
-        self.get_queue(ctx).clear()
-        if ctx.voice_client:
-            ctx.voice_client.stop()
-            await ctx.voice_client.disconnect()
+
+        async def stop():
+            self._clear_guild(ctx.guild.id)
+            vc = ctx.voice_client
+            if not vc:
+                return False
+            vc.stop()
+            await vc.disconnect()
+            return True
+
+        if await self.get_player(ctx).call(stop):
             await ctx.send(f"{Config.EMOJI_STOP} Reproducción detenida y cola limpiada")
 
     # ──────────────────────────────────────────
@@ -286,8 +589,8 @@ class Music(commands.Cog):
     # ──────────────────────────────────────────
 
     @commands.command(name="queue", aliases=["q"])
-    async def queue_command(self, ctx):
-        """Muestra la cola de reproducción"""
+    async def queue_command(self, ctx, page: int = 1):
+        """Muestra la cola de reproducción (10 canciones por página)"""
         queue = self.get_queue(ctx)
 
         if not queue.current and queue.is_empty():
@@ -304,24 +607,30 @@ class Music(commands.Cog):
                 value=(
                     f"**[{queue.current.title}]({queue.current.webpage_url})**\n"
                     f"Duración: {queue.current.format_duration()} | "
-                    f"Solicitado por: {queue.current.requester.mention}"
+                    f"Solicitado por: {queue.current.requester_mention}"
                 ),
                 inline=False,
             )
 
-        if not queue.is_empty():
-            songs_list = queue.get_queue()
+        total = len(queue)
+        if total:
+            pages = (total + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE
+            page = min(max(page, 1), pages)
+            start = (page - 1) * QUEUE_PAGE_SIZE
+            songs = queue.page(start, QUEUE_PAGE_SIZE)
             lines = [
-                f"`{i+1}.` **{s.title}** ({s.format_duration()})"
-                for i, s in enumerate(songs_list[:10])
+                f"`{start + i + 1}.` **{s.title}** ({s.format_duration()})"
+                for i, s in enumerate(songs)
             ]
             embed.add_field(
-                name=f"📜 Próximas {min(len(songs_list), 10)} canciones",
+                name=f"📜 Próximas canciones ({start + 1}-{start + len(songs)})",
                 value="\n".join(lines),
                 inline=False,
             )
-            if len(songs_list) > 10:
-                embed.set_footer(text=f"Y {len(songs_list) - 10} canciones más...")
+            embed.set_footer(
+                text=f"Página {page}/{pages} — {total} canciones en cola"
+                + (" | Usa !queue <página>" if pages > 1 else "")
+            )
 
         await ctx.send(embed=embed)
 
@@ -339,12 +648,60 @@ class Music(commands.Cog):
             description=f"**[{s.title}]({s.webpage_url})**",
             color=Config.COLOR_MUSIC,
         )
-        embed.add_field(name="Duración", value=s.format_duration(), inline=True)
-        embed.add_field(name="Solicitado por", value=s.requester.mention, inline=True)
+        source = ctx.voice_client.source if ctx.voice_client else None
+        if source is not None and hasattr(source, "position"):
+            duration = f"{format_seconds(source.position)} / {s.format_duration()}"
+        else:
+            duration = s.format_duration()
+        embed.add_field(name="Duración", value=duration, inline=True)
+        embed.add_field(name="Solicitado por", value=s.requester_mention, inline=True)
+        if queue.filters:
+            embed.add_field(name="Filtros", value=queue.filters.describe(), inline=True)
         if s.thumbnail:
             embed.set_thumbnail(url=s.thumbnail)
         await ctx.send(embed=embed)
 
+    # ──────────────────────────────────────────
+    # POSICIÓN
+    # ──────────────────────────────────────────
+
+    async def _seek(self, ctx, position: float, *, relative: bool = False):
+        """Relanza FFmpeg en position sin volver a extraer con yt-dlp"""
+        if not ctx.voice_client or not ctx.voice_client.source:
+            await ctx.send(f"{Config.EMOJI_ERROR} No hay nada reproduciéndose")
+            return
+        player = self.get_player(ctx)
+        try:
+            applied = await player.call(
+                partial(player.seek, relative=relative), position
+            )
+        except Exception as e:
+            log.error(f"seek falló: {e}")
+            applied = None
+        if applied is None:
+            await ctx.send(f"{Config.EMOJI_ERROR} No se pudo cambiar la posición")
+            return
+        await ctx.send(f"⏩ Posición: **{format_seconds(applied)}**")
+
+    @commands.command(name="seek")
+    async def seek(self, ctx, timestamp: str):
+        """Salta a un punto de la canción (segundos, MM:SS o HH:MM:SS)"""
+        position = parse_seconds(timestamp)
+        if position is None:
+            await ctx.send(f"{Config.EMOJI_ERROR} Formato inválido. Ej: `90`, `1:30`")
+            return
+        await self._seek(ctx, position)
+
+    @commands.command(name="forward", aliases=["fwd", "ff"])
+    async def forward(self, ctx, seconds: int = 10):
+        """Adelanta la canción (10 s por defecto)"""
+        await self._seek(ctx, seconds, relative=True)
+
+    @commands.command(name="rewind", aliases=["rw"])
+    async def rewind(self, ctx, seconds: int = 10):
+        """Retrocede la canción (10 s por defecto)"""
+        await self._seek(ctx, -seconds, relative=True)
+
     # ──────────────────────────────────────────
     # COMANDOS AVANZADOS
     # ──────────────────────────────────────────
@@ -356,28 +713,139 @@ class Music(commands.Cog):
             await ctx.send(f"{Config.EMOJI_ERROR} No estoy en un canal de voz")
             return
 
+        queue = self.get_queue(ctx)
         if vol is None:
-            current = (
-                int(ctx.voice_client.source.volume * 100)
-                if ctx.voice_client.source
-                else int(Config.DEFAULT_VOLUME * 100)
-            )
-            await ctx.send(f"🔊 Volumen actual: **{current}%**")
+            await ctx.send(f"🔊 Volumen actual: **{int(queue.volume * 100)}%**")
             return
 
         if not 0 <= vol <= 100:
             await ctx.send(f"{Config.EMOJI_ERROR} El volumen debe estar entre 0 y 100")
             return
 
-        if ctx.voice_client.source:
-            ctx.voice_client.source.volume = vol / 100
+        def set_volume():
+            queue.volume = vol / 100
+            vc = ctx.voice_client
+            source = vc.source if vc else None
+            if source:
+                if getattr(source, "live_volume", True):
+                    source.volume = queue.volume
+                else:
+                    # Modo opus: el volumen lo aplica FFmpeg → reiniciar en la posición actual
+                    swap_source(
+                        vc, source.restart(volume=queue.volume), loop=self.bot.loop
+                    )
+
+        await self.get_player(ctx).call(set_volume)
         await ctx.send(f"🔊 Volumen ajustado a **{vol}%**")
 
+    @commands.command(name="crossfade", aliases=["cf", "gapless"])
+    async def crossfade(self, ctx, seconds: str = None):
+        """Transiciones: off, 0 (sin silencio) o segundos de fundido cruzado"""
+        queue = self.get_queue(ctx)
+        if seconds is None:
+            if queue.crossfade is None:
+                estado = "desactivado"
+            elif queue.crossfade == 0:
+                estado = "gapless (sin silencio entre canciones)"
+            else:
+                estado = f"fundido de **{queue.crossfade:g}s**"
+            await ctx.send(f"🎚️ Crossfade: {estado}")
+            return
+
+        if seconds.lower() in ("off", "no"):
+            value = None
+        else:
+            try:
+                value = float(seconds)
+            except ValueError:
+                value = -1
+            if not 0 <= value <= Config.CROSSFADE_MAX:
+                await ctx.send(
+                    f"{Config.EMOJI_ERROR} Usa `off` o un valor entre 0 y "
+                    f"{Config.CROSSFADE_MAX} segundos"
+                )
+                return
+
+        player = self.get_player(ctx)
+        await player.call(player.set_crossfade, value)
+        if value is None:
+            await ctx.send("🎚️ Crossfade desactivado")
+        elif value == 0:
+            await ctx.send("🎚️ Modo gapless activado: sin silencio entre canciones")
+        else:
+            await ctx.send(f"🎚️ Crossfade de **{value:g}s** activado")
+
+    async def _set_filters(self, ctx, filters: FilterChain):
+        """Guarda los filtros del servidor y los aplica a lo que suena"""
+        try:
+            player = self.get_player(ctx)
+            applied = await player.call(player.set_filters, filters)
+        except Exception as e:
+            log.error(f"No se pudieron aplicar los filtros: {e}")
+            await ctx.send(f"{Config.EMOJI_ERROR} No se pudieron aplicar los filtros")
+            return
+        when = "" if applied else " (desde la próxima canción)"
+        await ctx.send(f"🎛️ Filtros: **{filters.describe()}**{when}")
+
+    @commands.command(name="filter", aliases=["filters", "fx"])
+    async def filter(self, ctx, name: str = None):
+        """Activa/quita un filtro (bassboost, nightcore, vaporwave, 8d) u off"""
+        queue = self.get_queue(ctx)
+        if name is None:
+            await ctx.send(
+                f"🎛️ Filtros: **{queue.filters.describe()}**\n"
+                f"Disponibles: {', '.join(f'`{p}`' for p in PRESETS)}, `off`"
+            )
+            return
+
+        name = name.lower()
+        if name in ("off", "reset", "clear"):
+            filters = FilterChain()
+        elif name in PRESETS:
+            filters = queue.filters.toggled(name)
+        else:
+            await ctx.send(
+                f"{Config.EMOJI_ERROR} Filtro desconocido. "
+                f"Disponibles: {', '.join(f'`{p}`' for p in PRESETS)}, `off`"
+            )
+            return
+        await self._set_filters(ctx, filters)
+
+    @commands.command(name="eq", aliases=["equalizer"])
+    async def eq(self, ctx, *gains: str):
+        """Ecualizador de 5 bandas en dB (60, 230, 910, 3600, 14000 Hz) u off"""
+        queue = self.get_queue(ctx)
+        bands = " / ".join(f"{f} Hz" for f in EQ_BANDS)
+        if not gains:
+            await ctx.send(f"🎛️ Ecualizador ({bands}): **{queue.filters.describe()}**")
+            return
+
+        if len(gains) == 1 and gains[0].lower() in ("off", "reset", "flat"):
+            await self._set_filters(ctx, queue.filters.with_eq(None))
+            return
+
+        try:
+            values = [float(g) for g in gains]
+        except ValueError:
+            values = []
+        if len(values) != len(EQ_BANDS) or any(abs(v) > EQ_MAX_DB for v in values):
+            await ctx.send(
+                f"{Config.EMOJI_ERROR} Usa {len(EQ_BANDS)} valores entre "
+                f"-{EQ_MAX_DB} y {EQ_MAX_DB} dB ({bands}) u `off`"
+            )
+            return
+        await self._set_filters(ctx, queue.filters.with_eq(values))
+
     @commands.command(name="loop", aliases=["repeat"])
     async def loop_cmd(self, ctx):
         """Activa/desactiva el loop de la canción actual"""
         queue = self.get_queue(ctx)
-        queue.loop = not queue.loop
+
+        def toggle():
+            queue.loop = not queue.loop
+            self._refresh_prefetch(ctx)
+
+        await self.get_player(ctx).call(toggle)
         estado = "activado 🔁" if queue.loop else "desactivado"
         await ctx.send(f"Loop {estado}")
 
@@ -385,7 +853,12 @@ class Music(commands.Cog):
     async def loopqueue(self, ctx):
         """Activa/desactiva el loop de toda la cola"""
         queue = self.get_queue(ctx)
-        queue.loop_queue = not queue.loop_queue
+
+        def toggle():
+            queue.loop_queue = not queue.loop_queue
+            self._refresh_prefetch(ctx)
+
+        await self.get_player(ctx).call(toggle)
         estado = "activado 🔁" if queue.loop_queue else "desactivado"
         await ctx.send(f"Loop de cola {estado}")
 
@@ -396,7 +869,13 @@ class Music(commands.Cog):
         if queue.is_empty():
             await ctx.send(f"{Config.EMOJI_ERROR} La cola está vacía")
             return
-        count = queue.shuffle()
+
+        def shuffle():
+            count = queue.shuffle()
+            self._refresh_prefetch(ctx)
+            return count
+
+        count = await self.get_player(ctx).call(shuffle)
         await ctx.send(f"🔀 Cola mezclada — **{count}** canciones")
 
     @commands.command(name="remove", aliases=["rm"])
@@ -406,15 +885,47 @@ class Music(commands.Cog):
         if queue.is_empty():
             await ctx.send(f"{Config.EMOJI_ERROR} La cola está vacía")
             return
-        if index < 1 or index > len(queue):
+
+        def remove():
+            if index < 1 or index > len(queue):
+                return None
+            removed = queue.pop(index - 1)
+            self._refresh_prefetch(ctx)
+            return removed
+
+        removed = await self.get_player(ctx).call(remove)
+        if removed is None:
             await ctx.send(
                 f"{Config.EMOJI_ERROR} Posición inválida. La cola tiene {len(queue)} canciones"
             )
             return
-        removed = queue.get_queue()[index - 1]
-        queue.remove(index - 1)
         await ctx.send(f"{Config.EMOJI_SUCCESS} Removido: **{removed.title}**")
 
+    @commands.command(name="move", aliases=["mv"])
+    async def move(self, ctx, src: int, dst: int):
+        """Mueve una canción de la cola a otra posición"""
+        queue = self.get_queue(ctx)
+        if queue.is_empty():
+            await ctx.send(f"{Config.EMOJI_ERROR} La cola está vacía")
+            return
+
+        def move():
+            song = queue.get(src - 1)
+            if not queue.move(src - 1, dst - 1):
+                return None
+            self._refresh_prefetch(ctx)
+            return song
+
+        song = await self.get_player(ctx).call(move)
+        if song is None:
+            await ctx.send(
+                f"{Config.EMOJI_ERROR} Posición inválida. La cola tiene {len(queue)} canciones"
+            )
+            return
+        await ctx.send(
+            f"{Config.EMOJI_SUCCESS} Movido: **{song.title}** a la posición {dst}"
+        )
+
     @commands.command(name="clear", aliases=["clean"])
     async def clear(self, ctx):
         """Limpia las canciones pendientes sin detener la reproducción actual"""
@@ -422,7 +933,13 @@ class Music(commands.Cog):
         if queue.is_empty():
             await ctx.send(f"{Config.EMOJI_ERROR} La cola ya está vacía")
             return
-        count = queue.clear_queue_only()
+
+        def clear():
+            count = queue.clear_queue_only()
+            self._refresh_prefetch(ctx)
+            return count
+
+        count = await self.get_player(ctx).call(clear)
         await ctx.send(
             f"{Config.EMOJI_SUCCESS} Cola limpiada — **{count}** canciones removidas"
         )
@@ -448,16 +965,17 @@ class Music(commands.Cog):
                 log.info(f"Reconexión en curso en {member.guild.name}, ignorando")
                 self.connecting.discard(guild_id)
                 return
-            queue = self.queues.get(guild_id)
-            if queue:
-                queue.clear()
+            player = self.players.get(guild_id)
+            if player:
+                await player.call(self._clear_guild, guild_id)
+            else:
+                self._clear_guild(guild_id)
             log.info(f"Bot desconectado de {member.guild.name}")
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild):
         """Libera la cola al ser expulsado de un servidor"""
-        self.queues.pop(guild.id, None)
-        self.connecting.discard(guild.id)
+        self._release(guild.id, keep_settings=False)
         log.info(f"Cola liberada para servidor eliminado: {guild.name}")
 
 
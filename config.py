@@ -25,11 +25,49 @@ class Config:
 
     # Archivos externos
     COOKIES_PATH = os.getenv("COOKIES_PATH", "./cookies.txt")
+    # Rutas de FFmpeg/Opus descubiertas en el arranque anterior
+    RUNTIME_STATE_PATH = os.getenv("RUNTIME_STATE_PATH", "./data/runtime_state.json")
 
     # Música
     MAX_QUEUE_SIZE = 100
     DEFAULT_VOLUME = 0.5
     INACTIVITY_TIMEOUT = 300  # segundos antes de desconectar por inactividad
+    # Segundos sin comandos ni voz tras los que se libera la cola de un
+    # servidor (volumen, crossfade y filtros se conservan aparte)
+    GUILD_STATE_TTL = int(os.getenv("GUILD_STATE_TTL", 1800))
+    BATCH_MAX = 25  # canciones por !playmany
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 3))  # búsquedas a la vez
+
+    # Caché de búsquedas (query normalizada / ID de video → resultado de yt-dlp)
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 512))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 1800))  # segundos
+
+    # Caché de URLs de stream ya resueltas (se respeta el "expire" de googlevideo)
+    STREAM_CACHE_SIZE = int(os.getenv("STREAM_CACHE_SIZE", 1024))
+    # Margen (s) antes del expire, además de la duración de la canción
+    STREAM_URL_MARGIN = 300
+
+    # Precarga de la siguiente canción (además de resolverla, lanzar ya su FFmpeg)
+    PREFETCH_SPAWN_FFMPEG = os.getenv("PREFETCH_SPAWN_FFMPEG", "0") == "1"
+
+    # Gapless / crossfade (!crossfade): FFmpeg de la siguiente canción lanzado
+    # GAPLESS_LEAD segundos antes del fundido
+    GAPLESS_LEAD = float(os.getenv("GAPLESS_LEAD", 10))
+    CROSSFADE_MAX = 12  # segundos
+
+    # Avisos de música (utils/notifier.py): ventana en la que se agrupan los
+    # "Reproduciendo" / "Agregado a la cola" y tareas que envían a Discord
+    NOTIFY_DEBOUNCE = float(os.getenv("NOTIFY_DEBOUNCE", 1.0))  # segundos
+    NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", 2))
+    # !play solo muestra "Buscando..." si la búsqueda tarda más que esto
+    SEARCH_NOTICE_DELAY = 0.5  # segundos
+
+    # Sharding: None = lo que recomiende Discord (ver launcher.py)
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None
+    SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()]
+    CLUSTERS = int(os.getenv("CLUSTERS", 0)) or os.cpu_count() or 1  # procesos
+    CLUSTER_STATS_INTERVAL = 30  # segundos entre reportes al supervisor
+    CLUSTER_ID = os.getenv("CLUSTER_ID")  # lo pone launcher.py en cada cluster
 
     # Conexión de voz
     CONNECT_TIMEOUT = 60.0  # bajar de 60
@@ -55,6 +93,38 @@ class Config:
         },
     }
 
+    # Perfiles de opciones sobre YDL_OPTIONS (None elimina la opción)
+    YDL_PROFILES = {
+        "cookies": {},
+        "no_cookies": {"cookiefile": None},
+        # Listado rápido de playlists: solo metadatos, sin resolver streams
+        "playlist": {
+            "noplaylist": False,
+            "extract_flat": "in_playlist",
+            "playlistend": MAX_QUEUE_SIZE,
+        },
+        # Clientes alternativos para cuando fallan los de YDL_OPTIONS
+        "client_ios": {
+            "cookiefile": None,
+            "extractor_args": {"youtube": {"player_client": ["ios"]}},
+        },
+        "client_tv": {
+            "cookiefile": None,
+            "extractor_args": {"youtube": {"player_client": ["tv"]}},
+        },
+    }
+    # Perfiles que se construyen al precalentar el pool (el resto, al usarse)
+    YDL_WARM_PROFILES = ("cookies", "no_cookies", "playlist")
+    # Orden en que búsquedas y resoluciones prueban los perfiles; los que fallan
+    # BREAKER_FAILURES veces seguidas se saltan BREAKER_COOLDOWN segundos
+    # (el plazo se duplica en cada recaída hasta BREAKER_MAX_COOLDOWN)
+    EXTRACT_PROFILES = ("cookies", "no_cookies", "client_ios", "client_tv")
+    BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 3))
+    BREAKER_COOLDOWN = int(os.getenv("BREAKER_COOLDOWN", 120))  # segundos
+    BREAKER_MAX_COOLDOWN = 1800
+    YDL_POOL_SIZE = int(os.getenv("YDL_POOL_SIZE", 4))  # instancias por perfil
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", 4))  # extracciones simultáneas
+
     # FFmpeg — opciones estables para streaming de voz
     FFMPEG_OPTIONS = {
         "before_options": (
@@ -66,6 +136,28 @@ class Config:
         "options": "-vn -bufsize 64k",
     }
 
+    # Modo de audio:
+    # - "pcm":  FFmpeg → PCM, volumen y codificación Opus en este proceso
+    # - "opus": FFmpeg entrega Opus (copia directa si el stream ya es Opus 48 kHz
+    #           y el volumen es 100 %); cambiar el volumen reinicia FFmpeg
+    AUDIO_MODE = os.getenv("AUDIO_MODE", "pcm").lower()
+
+    # Caché en disco de audio Opus por ID de video (vacío = desactivada).
+    # Con launcher.py cada cluster usa su subcarpeta y su propio presupuesto
+    AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "")
+    AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", 2048))
+
+    # Normalización de sonoridad (solo modo pcm mide): cada video se mide la
+    # primera vez que suena entero o al menos LOUDNESS_MIN_SECONDS, y las
+    # siguientes reproducciones llevan ya la ganancia hacia LOUDNESS_TARGET
+    LOUDNESS_NORMALIZE = os.getenv("LOUDNESS_NORMALIZE", "0") == "1"
+    LOUDNESS_TARGET = float(os.getenv("LOUDNESS_TARGET", -16.0))  # dBFS
+    LOUDNESS_MAX_BOOST = 6.0  # dB
+    LOUDNESS_MIN_SECONDS = 30
+    LOUDNESS_CACHE_PATH = os.getenv("LOUDNESS_CACHE_PATH", "./data/loudness.json")
+    LOUDNESS_CACHE_SIZE = 20000  # videos
+    LOUDNESS_FLUSH_DELAY = 30  # segundos: las medidas se escriben en tandas
+
     # Colores para embeds
     COLOR_SUCCESS = 0x2ECC71
     COLOR_ERROR = 0xE74C3C
@@ -0,0 +1,230 @@
+"""
+Lanzador multi-proceso: reparte los shards en clusters (un proceso cada uno)
+y los supervisa
+
+Uso: python launcher.py   (CLUSTERS / SHARD_COUNT en .env)
+"""
+
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import time
+import urllib.request
+from typing import Optional
+from config import Config
+
+log = logging.getLogger("launcher")
+
+START_DELAY = 5.0  # entre clusters: Discord limita los IDENTIFY por token
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 300.0  # un cluster que vivió esto vuelve al backoff mínimo
+REPORT_EVERY = 60.0
+
+
+def recommended_shards() -> int:
+    """Número de shards que recomienda Discord (GET /gateway/bot)"""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={
+            "Authorization": f"Bot {Config.TOKEN}",
+            "User-Agent": "DiscordBot (launcher.py, 1.0)",
+        },
+    )
+    with urllib.request.urlopen(request, timeout=15) as response:
+        return int(json.load(response)["shards"])
+
+
+def split_shards(shard_count: int, clusters: int) -> list[list[int]]:
+    """Reparte 0..shard_count-1 en bloques contiguos lo más parejos posible"""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    groups, start = [], 0
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def _cluster_main(cluster_id: int, shard_ids: list, shard_count: int, stats_queue):
+    # bot se importa solo en el hijo: el supervisor no carga discord/opus
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # el supervisor decide el apagado
+    import bot
+
+    bot.run_cluster(cluster_id, shard_ids, shard_count, stats_queue)
+
+
+class Cluster:
+    def __init__(self, cluster_id: int, shard_ids: list):
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[mp.Process] = None
+        self.started_at = 0.0
+        self.restart_at: Optional[float] = None
+        self.backoff = 1.0
+        self.restarts = 0
+        self.stats: dict = {}
+
+
+class Supervisor:
+    """
+    Arranca un proceso por cluster, lo reinicia con backoff exponencial si
+    muere y agrega las estadísticas que cada uno envía por una Queue.
+    """
+
+    def __init__(self, shard_count: int, groups: list[list[int]]):
+        self.ctx = mp.get_context("spawn")
+        self.shard_count = shard_count
+        self.clusters = [Cluster(i, shards) for i, shards in enumerate(groups)]
+        self.stats_queue = self.ctx.Queue(maxsize=1000)
+        self._stopping = False
+
+    def start(self, cluster: Cluster):
+        # El hijo (spawn) hereda el entorno al arrancar y lee Config al importar
+        os.environ["CLUSTER_ID"] = str(cluster.id)
+        cluster.process = self.ctx.Process(
+            target=_cluster_main,
+            args=(cluster.id, cluster.shard_ids, self.shard_count, self.stats_queue),
+            name=f"cluster-{cluster.id}",
+        )
+        cluster.process.start()
+        cluster.started_at = time.monotonic()
+        cluster.restart_at = None
+        log.info(
+            f"Cluster {cluster.id} (pid {cluster.process.pid}) → shards {cluster.shard_ids}"
+        )
+
+    def stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for i, cluster in enumerate(self.clusters):
+            if i:
+                time.sleep(START_DELAY)
+            self.start(cluster)
+
+        next_report = time.monotonic() + REPORT_EVERY
+        while not self._stopping:
+            self._drain_stats(timeout=1.0)
+            self._check_clusters()
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + REPORT_EVERY
+
+        self.shutdown()
+
+    def _drain_stats(self, timeout: float):
+        try:
+            stats = self.stats_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            cluster_id = stats.get("cluster")
+            if cluster_id is not None and 0 <= cluster_id < len(self.clusters):
+                self.clusters[cluster_id].stats = stats
+            try:
+                stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _check_clusters(self):
+        now = time.monotonic()
+        for cluster in self.clusters:
+            proc = cluster.process
+            if proc is not None and proc.is_alive():
+                continue
+
+            if cluster.restart_at is None:
+                lived = now - cluster.started_at
+                if lived >= STABLE_AFTER:
+                    cluster.backoff = 1.0
+                log.warning(
+                    f"Cluster {cluster.id} terminó (código {proc.exitcode}) tras "
+                    f"{lived:.0f}s — reinicio en {cluster.backoff:.0f}s"
+                )
+                cluster.stats = {}
+                cluster.restart_at = now + cluster.backoff
+                cluster.backoff = min(cluster.backoff * 2, BACKOFF_MAX)
+            elif now >= cluster.restart_at:
+                cluster.restarts += 1
+                self.start(cluster)
+
+    def aggregate(self) -> dict:
+        reports = [c.stats for c in self.clusters if c.stats]
+        latencies = [
+            r["latency_ms"] for r in reports if r.get("latency_ms") is not None
+        ]
+        return {
+            "clusters": len(self.clusters),
+            "alive": sum(
+                1 for c in self.clusters if c.process and c.process.is_alive()
+            ),
+            "ready": sum(1 for r in reports if r.get("ready")),
+            "shards": self.shard_count,
+            "guilds": sum(r.get("guilds", 0) for r in reports),
+            "voice": sum(r.get("voice", 0) for r in reports),
+            "players": sum(r.get("players", 0) for r in reports),
+            "queued": sum(r.get("queued", 0) for r in reports),
+            "avg_latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "restarts": sum(c.restarts for c in self.clusters),
+        }
+
+    def report(self):
+        total = self.aggregate()
+        latency = total["avg_latency_ms"]
+        log.info(
+            f"Clusters {total['alive']}/{total['clusters']} vivos, "
+            f"{total['ready']} listos | Servidores: {total['guilds']} | "
+            f"Voz: {total['voice']} | Colas: {total['queued']} canciones | "
+            f"Latencia: {f'{latency:.0f}ms' if latency is not None else '—'} | "
+            f"Reinicios: {total['restarts']}"
+        )
+        for cluster in self.clusters:
+            s = cluster.stats
+            if s:
+                log.info(
+                    f"  Cluster {cluster.id} (pid {s['pid']}): shards {s['shards']}, "
+                    f"{s['guilds']} servidores, {s['voice']} en voz"
+                )
+
+    def shutdown(self):
+        log.info("Deteniendo clusters...")
+        for cluster in self.clusters:
+            if cluster.process and cluster.process.is_alive():
+                cluster.process.terminate()
+        for cluster in self.clusters:
+            if cluster.process:
+                cluster.process.join(timeout=10)
+                if cluster.process.is_alive():
+                    cluster.process.kill()
+        self.report()
+
+
+def main():
+    # Solo el supervisor: cada cluster (spawn) reimporta este módulo, y bot.py
+    # configura su propio logging, con el archivo de logs/
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    shard_count = Config.SHARD_COUNT or recommended_shards()
+    groups = split_shards(shard_count, Config.CLUSTERS)
+    log.info(
+        f"{shard_count} shards en {len(groups)} clusters "
+        f"({os.cpu_count()} CPUs disponibles)"
+    )
+    Supervisor(shard_count, groups).run()
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        mp.freeze_support()
+    main()
@@ -0,0 +1,336 @@
+"""
+Prueba de estrés sin red ni Discord: comandos concurrentes contra el buzón
+de GuildPlayer
+
+Varios usuarios por servidor lanzan a la vez !play, !skip, !volume, !shuffle,
+!remove, !move, !clear, !pause/!resume y !stop contra el cog de música real.
+yt-dlp, FFmpeg y el canal de voz son falsos: cada canción "suena" en un hilo
+aparte unos milisegundos y termina llamando al callback after, como el hilo
+de audio de discord.py.
+
+Comprueba:
+- que ninguna canción arranca con otra sonando (doble arranque),
+- que dos cartas del mismo servidor nunca se ejecutan a la vez,
+- que las cargas de servidores distintos sí avanzan a la vez,
+- que al terminar ninguna cola queda con canciones y el reproductor parado
+  (p. ej. una carga que nunca volvió porque se canceló su precarga),
+- que !stop y !skip no esperan a una carga lenta (yt-dlp o FFmpeg de
+  SLOW_LOAD segundos) y que la canción abandonada nunca llega a sonar.
+
+Uso: DISCORD_TOKEN=x python stress_actor.py [servidores] [usuarios] [comandos]
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from config import Config
+from cogs.music import Music
+from utils.filters import FilterChain
+from utils.notifier import notifier
+from utils.player import GuildPlayer
+from utils.youtube import YTDLSource
+
+GUILDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+USERS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+COMMANDS = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+SEED = 1234
+SLOW_LOAD = 3.0  # segundos que tarda en cargar una canción "slow-..."
+COMMAND_BUDGET = 0.1  # !stop / !skip durante esa carga deben responder antes
+
+violations: list[str] = []
+started: dict[int, list[str]] = {}
+busy: dict[int, bool] = {}
+loads = 0
+loads_max = 0
+
+
+# ── Dobles de yt-dlp, FFmpeg y Discord ────────
+
+
+class FakeSource:
+    live_volume = True
+
+    def __init__(self, url: str):
+        self.url = url
+        self.volume = Config.DEFAULT_VOLUME
+        self.filters = FilterChain()
+        self.position = 0.0
+
+    def cleanup(self):
+        pass
+
+
+async def fake_search(query, **kw):
+    await asyncio.sleep(random.uniform(0, 0.005))
+    return {"webpage_url": query, "title": query, "duration": 1}
+
+
+async def fake_from_url(url, **kw):
+    global loads, loads_max
+    loads += 1
+    loads_max = max(loads_max, loads)
+    try:
+        if url.startswith("slow-"):
+            await asyncio.sleep(SLOW_LOAD)
+        await asyncio.sleep(random.uniform(0, 0.02))
+    finally:
+        loads -= 1
+    return FakeSource(url)
+
+
+async def fake_resolve(url, **kw):
+    # La precarga tarda: así los comandos la cancelan a mitad de un take()
+    await asyncio.sleep(random.uniform(0.01, 0.05))
+    return {}
+
+
+class FakeVoiceClient:
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.connected = True
+        self.source = None
+        self._paused = False
+        self._stop = None
+        self._threads: list[threading.Thread] = []
+
+    def is_connected(self):
+        return self.connected
+
+    def is_playing(self):
+        return self.source is not None and not self._paused
+
+    def is_paused(self):
+        return self.source is not None and self._paused
+
+    def play(self, source, *, after, bitrate=None):
+        if self.source is not None:
+            violations.append(f"{self.guild_id}: doble arranque de {source.url}")
+        started[self.guild_id].append(source.url)
+        self.source = source
+        self._paused = False
+        stop = self._stop = threading.Event()
+
+        def audio_thread():
+            stop.wait(random.uniform(0.005, 0.03))
+            self.source = None
+            after(None)
+
+        thread = threading.Thread(target=audio_thread, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    async def disconnect(self, force=False):
+        self.stop()
+        self.connected = False
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+
+class FakeMessage:
+    async def edit(self, **kw):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, guild_id: int, user: int, voice_client: FakeVoiceClient):
+        self.guild = SimpleNamespace(id=guild_id, name=f"guild-{guild_id}")
+        self.author = SimpleNamespace(id=user, voice=SimpleNamespace(channel=None))
+        self.channel = self
+        self._vc = voice_client
+
+    @property
+    def voice_client(self):
+        return self._vc
+
+    async def send(self, *args, **kw):
+        return FakeMessage()
+
+
+async def fake_connect(self, ctx) -> bool:
+    ctx.voice_client.connected = True
+    return True
+
+
+def patch():
+    YTDLSource.search = staticmethod(fake_search)
+    YTDLSource.from_url = staticmethod(fake_from_url)
+    YTDLSource.resolve = staticmethod(fake_resolve)
+    Music._connect = fake_connect
+    notifier.now_playing = lambda *a, **kw: None
+    notifier.queued = lambda *a, **kw: None
+    notifier.send = lambda *a, **kw: None
+
+    # Marca de "dentro del buzón" para detectar dos cartas a la vez
+    deliver = GuildPlayer._deliver
+
+    async def guarded(self, *letter):
+        if busy.get(self.guild_id):
+            violations.append(f"{self.guild_id}: dos cartas a la vez")
+        busy[self.guild_id] = True
+        try:
+            await deliver(self, *letter)
+        finally:
+            busy[self.guild_id] = False
+
+    GuildPlayer._deliver = guarded
+
+
+# ── Carga ─────────────────────────────────────
+
+
+async def user(cog: Music, ctx: FakeContext, rng: random.Random):
+    for n in range(COMMANDS):
+        roll = rng.random()
+        if roll < 0.45:
+            await Music.play.callback(
+                cog, ctx, search=f"g{ctx.guild.id}-u{ctx.author.id}-{n}"
+            )
+        elif roll < 0.60:
+            await Music.skip.callback(cog, ctx)
+        elif roll < 0.67:
+            await Music.volume.callback(cog, ctx, rng.randint(0, 100))
+        elif roll < 0.74:
+            await Music.shuffle.callback(cog, ctx)
+        elif roll < 0.80:
+            await Music.remove.callback(cog, ctx, rng.randint(1, 3))
+        elif roll < 0.85:
+            await Music.move.callback(cog, ctx, rng.randint(1, 3), rng.randint(1, 3))
+        elif roll < 0.89:
+            await Music.clear.callback(cog, ctx)
+        elif roll < 0.93:
+            await Music.pause.callback(cog, ctx)
+        elif roll < 0.97:
+            await Music.resume.callback(cog, ctx)
+        else:
+            await Music.stop.callback(cog, ctx)
+        await asyncio.sleep(rng.uniform(0, 0.01))
+
+
+async def slow_load(cog: Music, vc: FakeVoiceClient) -> tuple[float, float]:
+    """!stop y luego !skip mientras carga una canción lenta"""
+    ctx = FakeContext(vc.guild_id, 0, vc)
+    timings = []
+    for command, songs in (
+        (Music.stop, ["slow-stop"]),
+        (Music.skip, ["slow-skip", "after-skip"]),
+    ):
+        for song in songs:
+            await Music.play.callback(cog, ctx, search=song)
+        await asyncio.sleep(0.1)  # la primera ya está cargando
+        t0 = time.perf_counter()
+        await command.callback(cog, ctx)
+        timings.append(time.perf_counter() - t0)
+
+    await asyncio.sleep(SLOW_LOAD + 0.5)  # lo que tardaría la carga abandonada
+    played = started[vc.guild_id]
+    for name, elapsed in zip(("!stop", "!skip"), timings):
+        if elapsed > COMMAND_BUDGET:
+            violations.append(f"{name} esperó {elapsed:.2f}s a una carga lenta")
+    for song in ("slow-stop", "slow-skip"):
+        if song in played:
+            violations.append(f"sonó {song} tras abandonar su carga")
+    if "after-skip" not in played:
+        violations.append("!skip durante la carga no pasó a la siguiente")
+    return timings[0], timings[1]
+
+
+async def drain(cog: Music, voice_clients: dict, timeout: float = 30.0) -> list[int]:
+    """Espera a que cada servidor conectado vacíe su cola; devuelve los atascados"""
+    deadline = time.monotonic() + timeout
+    while True:
+        stuck = []
+        for guild_id, vc in voice_clients.items():
+            queue = cog.queues.get(guild_id)
+            if vc.is_paused():
+                vc.resume()
+            if not vc.connected or queue is None:
+                continue
+            if len(queue) or vc.source is not None or queue.current:
+                stuck.append(guild_id)
+        if not stuck or time.monotonic() > deadline:
+            return stuck
+        await asyncio.sleep(0.05)
+
+
+async def main():
+    patch()
+    random.seed(SEED)
+    bot = SimpleNamespace(loop=asyncio.get_running_loop(), get_guild=lambda gid: None)
+    cog = Music(bot)
+
+    voice_clients = {}
+    users = []
+    for guild_id in range(1, GUILDS + 1):
+        vc = voice_clients[guild_id] = FakeVoiceClient(guild_id)
+        started[guild_id] = []
+        for n in range(USERS):
+            ctx = FakeContext(guild_id, n, vc)
+            users.append(user(cog, ctx, random.Random(SEED + guild_id * 100 + n)))
+
+    # Un servidor más, aparte de la carga aleatoria, con cargas lentas
+    slow_vc = voice_clients[GUILDS + 1] = FakeVoiceClient(GUILDS + 1)
+    started[GUILDS + 1] = []
+
+    t0 = time.perf_counter()
+    *_, (stop_s, skip_s) = await asyncio.gather(*users, slow_load(cog, slow_vc))
+    elapsed = time.perf_counter() - t0
+    stuck = await drain(cog, voice_clients)
+
+    report = cog.mailbox_report()
+    await cog.cog_unload()
+    for vc in voice_clients.values():
+        vc.stop()
+        vc.join()
+    await asyncio.sleep(0.05)  # callbacks after que quedaron en vuelo
+
+    calls = sum(r["calls"] for r in report)
+    avg_ms = sum(r["avg_ms"] * r["calls"] for r in report) / calls if calls else 0.0
+    print(
+        f"{GUILDS} servidores x {USERS} usuarios x {COMMANDS} comandos "
+        f"en {elapsed:.2f}s"
+    )
+    print(f"  Canciones arrancadas: {sum(len(s) for s in started.values())}")
+    print(f"  Comandos por buzón:   {calls} | media {avg_ms:.1f} ms")
+    print(
+        f"  Peor servidor:        profundidad máx. "
+        f"{max(r['depth_max'] for r in report)} | "
+        f"latencia máx. {max(r['max_ms'] for r in report):.1f} ms"
+    )
+    print(f"  Cargas a la vez:      {loads_max} (fuera de los buzones)")
+    print(
+        f"  Carga de {SLOW_LOAD:g}s:         !stop {stop_s * 1000:.1f} ms | "
+        f"!skip {skip_s * 1000:.1f} ms"
+    )
+
+    for guild_id in stuck:
+        violations.append(f"{guild_id}: cola atascada con el reproductor parado")
+    if loads_max < 2 and GUILDS > 1:
+        violations.append("los servidores no avanzaron en paralelo")
+    if violations:
+        print(f"FALLO: {len(violations)} problemas")
+        for line in violations[:20]:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,323 @@
+"""
+Caché en disco de audio Opus por ID de video
+"""
+
+import logging
+import os
+import shlex
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Optional
+import discord
+from discord.oggparse import OggStream
+from config import Config
+
+log = logging.getLogger("audio_cache")
+
+
+class PendingWrite:
+    """Archivo temporal que FFmpeg está escribiendo para un video"""
+
+    def __init__(self, video_id: str, tmp_path: str):
+        self.video_id = video_id
+        self.tmp_path = tmp_path
+
+
+class AudioCache:
+    """
+    Guarda como <id>.opus el audio de las canciones ya reproducidas.
+
+    - Se escribe como efecto secundario de la primera reproducción (FFmpeg
+      saca una segunda salida a un .part) y solo se confirma si la canción
+      llegó al final: rename atómico de .part a .opus.
+    - Presupuesto de disco con desalojo LRU; el orden de uso se guarda en el
+      mtime de cada archivo, así el índice se reconstruye con un solo
+      scandir al arrancar.
+    - El directorio es de un solo proceso: al arrancar borra los .part que
+      encuentre, y el índice y el presupuesto solo cuentan sus archivos. Con
+      launcher.py cada cluster usa su subcarpeta (ver cache_directory).
+    """
+
+    SUFFIX = ".opus"
+    PARTIAL = ".part"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: OrderedDict = OrderedDict()  # video_id -> tamaño en bytes
+        self._writing: set[str] = set()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        if self.enabled:
+            self._rebuild()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.directory, video_id + self.SUFFIX)
+
+    def _rebuild(self):
+        """Reconstruye el índice desde el directorio (más antiguo primero)"""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(self.PARTIAL):
+                    # Restos de una escritura interrumpida
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                elif entry.name.endswith(self.SUFFIX):
+                    st = entry.stat()
+                    found.append(
+                        (st.st_mtime, entry.name[: -len(self.SUFFIX)], st.st_size)
+                    )
+
+        found.sort()
+        for _, video_id, size in found:
+            self._index[video_id] = size
+            self.total_bytes += size
+        self._evict()
+        log.info(
+            f"Caché de audio: {len(self._index)} archivos, "
+            f"{self.total_bytes / 1_048_576:.1f} MB"
+        )
+
+    def get(self, video_id: Optional[str]) -> Optional[str]:
+        """Ruta del archivo en caché (y lo marca como reciente) o None"""
+        if not self.enabled or not video_id:
+            return None
+
+        with self._lock:
+            if video_id not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(video_id)
+            self.hits += 1
+
+        path = self._path(video_id)
+        try:
+            os.utime(path)
+        except OSError:
+            # Alguien lo borró por fuera
+            with self._lock:
+                self.total_bytes -= self._index.pop(video_id, 0)
+            return None
+        return path
+
+    def has(self, video_id: Optional[str]) -> bool:
+        """Consulta sin contar acierto/fallo ni tocar el orden LRU"""
+        return self.enabled and video_id in self._index
+
+    def remove(self, video_id: Optional[str]):
+        """Elimina un archivo de la caché (p. ej. si falló al reproducirse)"""
+        with self._lock:
+            size = self._index.pop(video_id, None)
+            if size is None:
+                return
+            self.total_bytes -= size
+        try:
+            os.remove(self._path(video_id))
+        except OSError:
+            pass
+
+    def begin(self, video_id: Optional[str]) -> Optional[PendingWrite]:
+        """Reserva la escritura de un video (None si ya está o se está escribiendo)"""
+        if not self.enabled or not video_id:
+            return None
+
+        with self._lock:
+            if video_id in self._index or video_id in self._writing:
+                return None
+            self._writing.add(video_id)
+
+        tmp_path = os.path.join(
+            self.directory, f"{video_id}.{os.getpid()}{self.SUFFIX}{self.PARTIAL}"
+        )
+        return PendingWrite(video_id, tmp_path)
+
+    def commit(self, pending: PendingWrite):
+        """Publica el archivo terminado y aplica el presupuesto de disco"""
+        try:
+            size = os.path.getsize(pending.tmp_path)
+            os.replace(pending.tmp_path, self._path(pending.video_id))
+        except OSError as e:
+            log.warning(f"No se pudo guardar {pending.video_id} en caché: {e}")
+            self.abort(pending)
+            return
+
+        with self._lock:
+            self._writing.discard(pending.video_id)
+            self._index[pending.video_id] = size
+            self.total_bytes += size
+            self.writes += 1
+            self._evict()
+
+    def abort(self, pending: PendingWrite):
+        """Descarta una escritura incompleta"""
+        with self._lock:
+            self._writing.discard(pending.video_id)
+        try:
+            os.remove(pending.tmp_path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._index:
+            video_id, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(video_id))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "files": len(self._index),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+def tee_args(pending: PendingWrite, *, copy: bool) -> list:
+    """Salida extra de FFmpeg que vuelca el audio (en Opus) al .part"""
+    codec = ["-c:a", "copy"] if copy else ["-c:a", "libopus", "-b:a", "128k"]
+    return ["-map", "0:a:0", "-vn", *codec, "-f", "opus", pending.tmp_path]
+
+
+class _CacheWriterMixin:
+    """Confirma o descarta el .part según si FFmpeg terminó la canción"""
+
+    def _init_writer(self, pending: PendingWrite):
+        self._pending = pending
+        self._eof = False
+
+    def read(self) -> bytes:
+        ret = super().read()
+        if not ret:
+            self._eof = True
+        return ret
+
+    def cleanup(self) -> None:
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            completed = False
+            proc = self._process
+            if self._eof and proc:
+                try:
+                    completed = proc.wait(timeout=5) == 0
+                except subprocess.TimeoutExpired:
+                    completed = False
+            super().cleanup()
+            if completed:
+                audio_cache.commit(pending)
+            else:
+                audio_cache.abort(pending)
+            return
+        super().cleanup()
+
+
+class CachingPCMAudio(_CacheWriterMixin, discord.FFmpegPCMAudio):
+    """FFmpegPCMAudio que además guarda el audio en la caché de disco"""
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        pending: PendingWrite,
+        copy: bool,
+        before_options: str,
+        options: str,
+    ):
+        # fmt: off
+        args = [
+            *shlex.split(before_options),
+            "-i", source,
+            *tee_args(pending, copy=copy),
+            "-map", "0:a:0",
+            "-f", "s16le", "-ar", "48000", "-ac", "2",
+            "-loglevel", "warning",
+            *shlex.split(options),
+            "pipe:1",
+        ]
+        # fmt: on
+        discord.FFmpegAudio.__init__(
+            self,
+            source,
+            executable=Config.FFMPEG_PATH,
+            args=args,
+            stdin=subprocess.DEVNULL,
+            stderr=None,
+        )
+        self._init_writer(pending)
+
+
+class CachingOpusAudio(_CacheWriterMixin, discord.FFmpegOpusAudio):
+    """FFmpegOpusAudio que además guarda el audio en la caché de disco"""
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        pending: PendingWrite,
+        copy: bool,
+        pipe_copy: bool,
+        bitrate: Optional[int] = None,
+        before_options: str,
+        options: str,
+    ):
+        # fmt: off
+        args = [
+            *shlex.split(before_options),
+            "-i", source,
+            *tee_args(pending, copy=copy),
+            "-map", "0:a:0",
+            "-map_metadata", "-1",
+            "-f", "opus",
+            "-c:a", "copy" if pipe_copy else "libopus",
+            "-ar", "48000", "-ac", "2", "-b:a", f"{bitrate or 128}k",
+            "-loglevel", "warning",
+            "-fec", "true", "-packet_loss", "15",
+            "-blocksize", str(self.BLOCKSIZE),
+            *shlex.split(options),
+            "pipe:1",
+        ]
+        # fmt: on
+        discord.FFmpegAudio.__init__(
+            self,
+            source,
+            executable=Config.FFMPEG_PATH,
+            args=args,
+            stdin=subprocess.DEVNULL,
+            stderr=None,
+        )
+        self._packet_iter = OggStream(self._stdout).iter_packets()
+        self._init_writer(pending)
+
+
+def cache_directory() -> str:
+    """AUDIO_CACHE_DIR, o su subcarpeta cluster-<id> con launcher.py"""
+    if Config.AUDIO_CACHE_DIR and Config.CLUSTER_ID is not None:
+        return os.path.join(Config.AUDIO_CACHE_DIR, f"cluster-{Config.CLUSTER_ID}")
+    return Config.AUDIO_CACHE_DIR
+
+
+audio_cache = AudioCache(cache_directory(), Config.AUDIO_CACHE_MAX_MB * 1_048_576)
@@ -0,0 +1,154 @@
+"""
+Circuit breakers por perfil de opciones de yt-dlp
+"""
+
+import logging
+import time
+from typing import Iterable, Iterator
+from config import Config
+
+log = logging.getLogger("breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Estado de salud de un perfil (cookies, sin cookies, un player_client...).
+
+    - closed: se usa con normalidad.
+    - open: tras `failures` fallos seguidos se salta durante `cooldown`
+      segundos (que se duplica en cada recaída, hasta `max_cooldown`).
+    - half_open: vencido el plazo, una sola petición lo vuelve a probar;
+      si funciona se cierra, si no se abre otra vez.
+
+    Solo se usa desde el event loop: no necesita locks.
+    """
+
+    def __init__(
+        self, name: str, *, failures: int, cooldown: float, max_cooldown: float
+    ):
+        self.name = name
+        self.threshold = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_until = 0.0
+        self.probe_started = 0.0
+
+        # Métricas
+        self.successes = 0
+        self.failures = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """¿Puede intentarse ahora? Puede pasar de open a half_open."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now < self.opened_until:
+                return False
+            self.state = HALF_OPEN
+            self.probe_started = now
+            log.info(f"Perfil {self.name}: probando de nuevo")
+            return True
+        # half_open: una sola prueba a la vez (salvo que la anterior se perdiera)
+        if now - self.probe_started > self.base_cooldown:
+            self.probe_started = now
+            return True
+        return False
+
+    def success(self):
+        self.successes += 1
+        self.consecutive = 0
+        if self.state != CLOSED:
+            log.info(f"Perfil {self.name}: recuperado")
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+
+    def failure(self):
+        self.failures += 1
+        self.consecutive += 1
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == CLOSED and self.consecutive >= self.threshold:
+            self.trips += 1
+            self._open()
+
+    def release(self):
+        """La prueba no fue concluyente: volver a open sin alargar el plazo"""
+        if self.state == HALF_OPEN:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_until = time.monotonic() + self.cooldown
+        log.warning(
+            f"Perfil {self.name}: circuito abierto durante {self.cooldown:.0f}s "
+            f"({self.consecutive} fallos seguidos)"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive": self.consecutive,
+            "successes": self.successes,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": (
+                max(0.0, self.opened_until - time.monotonic())
+                if self.state == OPEN
+                else 0.0
+            ),
+        }
+
+
+class ProfileBreakers:
+    """Un CircuitBreaker por perfil, creado al primer uso"""
+
+    def __init__(self, *, failures: int, cooldown: float, max_cooldown: float):
+        self._options = {
+            "failures": failures,
+            "cooldown": cooldown,
+            "max_cooldown": max_cooldown,
+        }
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, profile: str) -> CircuitBreaker:
+        breaker = self._breakers.get(profile)
+        if breaker is None:
+            breaker = self._breakers[profile] = CircuitBreaker(profile, **self._options)
+        return breaker
+
+    def candidates(self, profiles: Iterable[str]) -> Iterator[str]:
+        """
+        Perfiles a intentar, en orden de preferencia, saltando los abiertos.
+        Es perezoso: allow() (que arranca las pruebas) solo se consulta al
+        llegar a cada perfil. Si todos están abiertos se intenta el que antes
+        vuelve a estar disponible, para no fallar sin haber probado nada.
+        """
+        profiles = list(profiles)
+        tried = False
+        for profile in profiles:
+            if self.get(profile).allow():
+                tried = True
+                yield profile
+        if not tried and profiles:
+            yield min(profiles, key=lambda p: self.get(p).opened_until)
+
+    def stats(self) -> dict:
+        return {name: b.stats() for name, b in self._breakers.items()}
+
+
+profile_breakers = ProfileBreakers(
+    failures=Config.BREAKER_FAILURES,
+    cooldown=Config.BREAKER_COOLDOWN,
+    max_cooldown=Config.BREAKER_MAX_COOLDOWN,
+)
@@ -0,0 +1,93 @@
+"""
+Filtros de audio por servidor (bassboost, nightcore, 8D, ecualizador)
+compilados en un grafo -af de FFmpeg
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+# nombre → (filtros de FFmpeg, factor de velocidad, grupo excluyente)
+# Los de velocidad remuestrean a 48 kHz antes de asetrate para que el
+# factor sea el mismo sea cual sea la frecuencia del stream.
+PRESETS: dict[str, tuple[str, float, Optional[str]]] = {
+    "bassboost": ("bass=g=8:f=110:w=0.6", 1.0, None),
+    "nightcore": ("aresample=48000,asetrate=60000,aresample=48000", 1.25, "speed"),
+    "vaporwave": ("aresample=48000,asetrate=38400,aresample=48000", 0.8, "speed"),
+    "8d": ("apulsator=hz=0.08", 1.0, None),
+}
+
+EQ_BANDS = (60, 230, 910, 3600, 14000)  # Hz
+EQ_MAX_DB = 12
+
+
+@lru_cache(maxsize=64)
+def compile_graph(presets: tuple, eq: Optional[tuple]) -> Optional[str]:
+    """
+    Grafo -af para una combinación (presets en orden canónico). Sin espacios:
+    discord.py parte las opciones con shlex.
+    """
+    parts = []
+    if eq:
+        parts.extend(
+            f"equalizer=f={freq}:t=o:w=1:g={gain:g}"
+            for freq, gain in zip(EQ_BANDS, eq)
+            if gain
+        )
+    parts.extend(PRESETS[name][0] for name in presets)
+    return ",".join(parts) or None
+
+
+class FilterChain:
+    """
+    Filtros activos de un servidor. Inmutable: cada cambio crea otra, así
+    las fuentes ya lanzadas pueden compararse con la del servidor.
+    """
+
+    __slots__ = ("presets", "eq")
+
+    def __init__(self, presets: Iterable[str] = (), eq: Optional[Sequence] = None):
+        wanted = set(presets)
+        self.presets = tuple(name for name in PRESETS if name in wanted)
+        self.eq = tuple(float(g) for g in eq) if eq and any(eq) else None
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, FilterChain)
+            and self.presets == other.presets
+            and self.eq == other.eq
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.presets, self.eq))
+
+    def __bool__(self) -> bool:
+        return bool(self.presets or self.eq)
+
+    @property
+    def graph(self) -> Optional[str]:
+        return compile_graph(self.presets, self.eq)
+
+    @property
+    def tempo(self) -> float:
+        """Segundos de canción por segundo reproducido"""
+        tempo = 1.0
+        for name in self.presets:
+            tempo *= PRESETS[name][1]
+        return tempo
+
+    def toggled(self, name: str) -> "FilterChain":
+        """Activa o quita name (quitando los de su mismo grupo)"""
+        if name in self.presets:
+            return FilterChain((p for p in self.presets if p != name), self.eq)
+        group = PRESETS[name][2]
+        kept = [p for p in self.presets if group is None or PRESETS[p][2] != group]
+        return FilterChain([*kept, name], self.eq)
+
+    def with_eq(self, gains: Optional[Sequence[float]]) -> "FilterChain":
+        return FilterChain(self.presets, gains)
+
+    def describe(self) -> str:
+        names = list(self.presets)
+        if self.eq:
+            names.append("eq " + " ".join(f"{g:+g}" for g in self.eq))
+        return ", ".join(names) or "ninguno"
@@ -0,0 +1,138 @@
+"""
+Elección del formato de audio según el bitrate del canal de voz
+"""
+
+import threading
+from collections import Counter
+from typing import Optional
+
+DEFAULT_TARGET_KBPS = 128  # bitrate por defecto del encoder de discord.py
+
+
+def target_kbps(voice_client) -> Optional[int]:
+    """Bitrate (kbps) del canal de voz conectado, o None si no se sabe"""
+    channel = getattr(voice_client, "channel", None)
+    bitrate = getattr(channel, "bitrate", None)
+    if not bitrate:
+        return None
+    return max(16, min(512, bitrate // 1000))
+
+
+def _is_opus48(fmt: dict) -> bool:
+    return (fmt.get("acodec") or "").startswith("opus") and fmt.get("asr") in (
+        48000,
+        None,
+    )
+
+
+def _tier(fmt: dict) -> int:
+    """
+    Orden de preferencia (menor = mejor):
+    0. Opus a 48 kHz solo audio: ni remuestreo ni cambio de códec
+    1. Otro códec solo audio (AAC/Vorbis): decodificar y remuestrear
+    2. Formato con video: descarga el video para tirarlo
+    """
+    if fmt.get("vcodec") not in (None, "none"):
+        return 2
+    return 0 if _is_opus48(fmt) else 1
+
+
+def _abr(fmt: dict) -> float:
+    return fmt.get("abr") or fmt.get("tbr") or 0
+
+
+def select_audio_format(data: dict, target: Optional[int]) -> dict:
+    """
+    Formato de audio de data["formats"] para un canal de target kbps.
+
+    Dentro del mejor nivel disponible (ver _tier) se elige el de menor abr
+    que alcance target; si ninguno llega, el de mayor abr. Sin lista de
+    formatos (caché de disco, extracción plana) se usa data tal cual.
+    """
+    formats = [
+        f
+        for f in data.get("formats") or ()
+        if f.get("url") and f.get("acodec") not in (None, "none")
+    ]
+    if not formats:
+        if "url" in data:
+            return data
+        raise ValueError("No se pudo obtener URL de audio del resultado de yt-dlp")
+
+    target = target or DEFAULT_TARGET_KBPS
+    best_tier = min(_tier(f) for f in formats)
+    candidates = [f for f in formats if _tier(f) == best_tier]
+
+    enough = [f for f in candidates if _abr(f) >= target]
+    if enough:
+        return min(enough, key=_abr)
+    return max(candidates, key=_abr)
+
+
+def describe(fmt: dict, *, target: Optional[int], duration, passthrough: bool) -> dict:
+    """
+    Formato elegido y su coste estimado: etapas de proceso que implica
+    (passthrough = FFmpeg copia los paquetes Opus) y MB a descargar.
+    """
+    acodec = (fmt.get("acodec") or "desconocido").split(".")[0]
+    asr = fmt.get("asr")
+    abr = _abr(fmt)
+    target = target or DEFAULT_TARGET_KBPS
+
+    stages = []
+    if not passthrough:
+        stages.append(f"decode:{acodec}")
+        if asr and asr != 48000:
+            stages.append(f"resample:{asr}→48000")
+        stages.append(f"encode:opus@{target}k")
+
+    return {
+        "format_id": fmt.get("format_id"),
+        "acodec": acodec,
+        "asr": asr,
+        "abr": abr,
+        "target_kbps": target,
+        "pipeline": stages or ["copy"],
+        "download_mb": round(abr * (duration or 0) / 8 / 1000, 2) if abr else None,
+        "over_target_kbps": max(0, abr - target) if abr else 0,
+    }
+
+
+class FormatStats:
+    """Contadores de formatos elegidos (para !stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_codec: Counter = Counter()
+        self.resampled = 0
+        self.passthrough = 0
+        self.tracks = 0
+        self.download_mb = 0.0
+        self.over_target_kbps = 0.0
+
+    def record(self, info: dict):
+        with self._lock:
+            self.tracks += 1
+            self.by_codec[info["acodec"]] += 1
+            if any(stage.startswith("resample") for stage in info["pipeline"]):
+                self.resampled += 1
+            if info["pipeline"] == ["copy"]:
+                self.passthrough += 1
+            self.download_mb += info["download_mb"] or 0
+            self.over_target_kbps += info["over_target_kbps"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracks": self.tracks,
+                "by_codec": dict(self.by_codec),
+                "resampled": self.resampled,
+                "passthrough": self.passthrough,
+                "download_mb": round(self.download_mb, 1),
+                "avg_over_target_kbps": (
+                    self.over_target_kbps / self.tracks if self.tracks else 0.0
+                ),
+            }
+
+
+format_stats = FormatStats()
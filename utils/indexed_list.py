@@ -0,0 +1,180 @@
+"""
+Lista por bloques con acceso posicional O(log n)
+"""
+
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+class IndexedList:
+    """
+    Secuencia guardada en bloques de a lo sumo 2 * LOAD elementos, con un
+    árbol de Fenwick sobre el tamaño de cada bloque.
+
+    - Ubicar la posición i cuesta O(log m) (m = número de bloques) y tocar
+      el bloque, O(LOAD): acceso, borrado, inserción y movimiento no
+      dependen del largo total.
+    - append y popleft son O(1) amortizado.
+    - slice(start, stop) devuelve solo los elementos pedidos, sin copiar la
+      secuencia entera.
+    """
+
+    LOAD = 64
+
+    def __init__(self, items: Optional[Iterable] = None):
+        self._chunks: List[list] = []
+        self._len = 0
+        self._tree: Optional[List[int]] = None  # Fenwick (1-based); None = reconstruir
+        if items is not None:
+            self._load(list(items))
+
+    def _load(self, items: list):
+        self._chunks = [
+            items[i : i + self.LOAD] for i in range(0, len(items), self.LOAD)
+        ]
+        self._len = len(items)
+        self._tree = None
+
+    # ── Árbol de Fenwick ──────────────────────
+
+    def _build_tree(self) -> List[int]:
+        tree = [0] + [len(c) for c in self._chunks]
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        return tree
+
+    def _update(self, chunk_index: int, delta: int):
+        tree = self._tree
+        if tree is None:
+            return  # se reconstruirá al siguiente acceso posicional
+        i = chunk_index + 1
+        size = len(tree)
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _locate(self, index: int):
+        """(bloque, desplazamiento) de la posición index, ya validada"""
+        tree = self._tree if self._tree is not None else self._build_tree()
+        pos = 0
+        remaining = index
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= tree[nxt]
+            step >>= 1
+        return pos, remaining
+
+    def _normalize(self, index: int) -> int:
+        if not isinstance(index, int):
+            raise TypeError("el índice debe ser un entero")
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("índice fuera de rango")
+        return index
+
+    def _drop_chunk_if_empty(self, chunk_index: int):
+        if not self._chunks[chunk_index]:
+            del self._chunks[chunk_index]
+            self._tree = None
+
+    def _split_if_full(self, chunk_index: int):
+        chunk = self._chunks[chunk_index]
+        if len(chunk) > 2 * self.LOAD:
+            self._chunks[chunk_index : chunk_index + 1] = [
+                chunk[: self.LOAD],
+                chunk[self.LOAD :],
+            ]
+            self._tree = None
+
+    # ── Secuencia ─────────────────────────────
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator:
+        return chain.from_iterable(self._chunks)
+
+    def __getitem__(self, index: int) -> Any:
+        chunk_index, offset = self._locate(self._normalize(index))
+        return self._chunks[chunk_index][offset]
+
+    def __delitem__(self, index: int):
+        self.pop(index)
+
+    def append(self, item: Any):
+        if not self._chunks or len(self._chunks[-1]) >= 2 * self.LOAD:
+            self._chunks.append([item])
+            self._tree = None
+        else:
+            self._chunks[-1].append(item)
+            self._update(len(self._chunks) - 1, 1)
+        self._len += 1
+
+    def popleft(self) -> Any:
+        if not self._len:
+            raise IndexError("popleft de una lista vacía")
+        item = self._chunks[0].pop(0)
+        self._len -= 1
+        self._update(0, -1)
+        self._drop_chunk_if_empty(0)
+        return item
+
+    def pop(self, index: int = -1) -> Any:
+        chunk_index, offset = self._locate(self._normalize(index))
+        item = self._chunks[chunk_index].pop(offset)
+        self._len -= 1
+        self._update(chunk_index, -1)
+        self._drop_chunk_if_empty(chunk_index)
+        return item
+
+    def insert(self, index: int, item: Any):
+        """Inserta antes de index (index >= len agrega al final)"""
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            self.append(item)
+            return
+        chunk_index, offset = self._locate(index)
+        self._chunks[chunk_index].insert(offset, item)
+        self._len += 1
+        self._update(chunk_index, 1)
+        self._split_if_full(chunk_index)
+
+    def move(self, src: int, dst: int):
+        """Mueve el elemento de la posición src a la posición dst"""
+        item = self.pop(src)
+        self.insert(dst, item)
+
+    def slice(self, start: int, stop: int) -> list:
+        """Elementos [start, stop) sin recorrer ni copiar el resto"""
+        start = max(0, start)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        chunk_index, offset = self._locate(start)
+        chunks = self._chunks
+        rest = chain(
+            islice(chunks[chunk_index], offset, None),
+            chain.from_iterable(chunks[i] for i in range(chunk_index + 1, len(chunks))),
+        )
+        return list(islice(rest, stop - start))
+
+    def clear(self):
+        self._chunks = []
+        self._len = 0
+        self._tree = None
+
+    def reload(self, items: Iterable):
+        """Reemplaza todo el contenido (p. ej. tras mezclar)"""
+        self._load(list(items))
@@ -0,0 +1,203 @@
+"""
+Normalización de sonoridad: medida una vez por video y guardada en disco
+"""
+
+import audioop
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+log = logging.getLogger("loudness")
+
+_FULL_SCALE = 32768.0
+_BLOCK_FRAMES = 20  # 400 ms por bloque
+_ABSOLUTE_GATE = 10 ** (-70 / 10) * _FULL_SCALE**2  # -70 dBFS
+_RELATIVE_GATE = 10 ** (-10 / 10)  # 10 dB por debajo de la media
+
+
+class LoudnessMeter:
+    """
+    Sonoridad integrada aproximada de una pista mientras suena.
+
+    Sigue el esquema de BS.1770 (bloques de 400 ms, compuerta absoluta a
+    -70 y relativa a -10 dB) sin la ponderación K: basta para igualar
+    canciones entre sí y solo cuesta un audioop.rms por frame.
+    """
+
+    __slots__ = ("_energy", "_frames", "blocks")
+
+    def __init__(self):
+        self._energy = 0.0
+        self._frames = 0
+        self.blocks: list[float] = []  # energía media de cada bloque
+
+    def add(self, frame: bytes):
+        rms = audioop.rms(frame, 2)
+        self._energy += rms * rms
+        self._frames += 1
+        if self._frames == _BLOCK_FRAMES:
+            self.blocks.append(self._energy / _BLOCK_FRAMES)
+            self._energy = 0.0
+            self._frames = 0
+
+    @property
+    def seconds(self) -> float:
+        return len(self.blocks) * _BLOCK_FRAMES * 0.02
+
+    def loudness(self) -> Optional[float]:
+        """dBFS integrados, o None si todo fue silencio"""
+        gated = [e for e in self.blocks if e > _ABSOLUTE_GATE]
+        if not gated:
+            return None
+        threshold = sum(gated) / len(gated) * _RELATIVE_GATE
+        gated = [e for e in gated if e > threshold]
+        mean = sum(gated) / len(gated)
+        return 10 * math.log10(mean / _FULL_SCALE**2)
+
+
+class LoudnessCache:
+    """
+    Sonoridad medida por ID de video, persistida en un JSON.
+
+    Se guarda la medida (no la ganancia): cambiar LOUDNESS_TARGET no obliga
+    a volver a medir. record() solo anota en memoria; las medidas nuevas se
+    escriben juntas flush_delay segundos después, en un hilo aparte (record()
+    también corre en el event loop, desde cleanup()). Al escribir se funde
+    con lo que haya en disco, porque varios clusters comparten el archivo.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        target: float,
+        max_boost: float,
+        size: int,
+        flush_delay: float,
+    ):
+        self.path = path
+        self.target = target
+        self.max_boost = max_boost
+        self.size = size
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # una escritura a la vez
+        self._entries: Optional[OrderedDict] = None  # se carga al primer uso
+        self._pending: dict[str, float] = {}  # medidas aún no escritas
+        self._timer: Optional[threading.Timer] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.measured = 0
+        self.writes = 0
+
+    def _load(self) -> OrderedDict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return OrderedDict(
+            (k, float(v)) for k, v in data.items() if isinstance(v, (int, float))
+        )
+
+    def _ensure(self) -> OrderedDict:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def gain(self, video_id: Optional[str]) -> Optional[float]:
+        """Ganancia lineal para video_id, o None si aún no se midió"""
+        if not video_id:
+            return None
+        with self._lock:
+            loudness = self._ensure().get(video_id)
+            if loudness is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        db = min(self.target - loudness, self.max_boost)
+        return 10 ** (db / 20)
+
+    def _trim(self, entries: OrderedDict):
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def record(self, video_id: str, loudness: float):
+        """Anota la medida; se escribe en disco en la próxima tanda"""
+        loudness = round(loudness, 2)
+        with self._lock:
+            entries = self._ensure()
+            entries[video_id] = loudness
+            entries.move_to_end(video_id)
+            self._trim(entries)
+            self._pending[video_id] = loudness
+            self.measured += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        log.info(f"Sonoridad de {video_id}: {loudness:.1f} dBFS")
+
+    def flush(self):
+        """Escribe las medidas pendientes (bloquea: fuera del event loop)"""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            # Lo que hayan medido otros clusters desde la última lectura
+            merged = self._load()
+            for key, value in pending.items():
+                merged[key] = value
+                merged.move_to_end(key)
+            self._trim(merged)
+            self._save(merged)
+
+            with self._lock:
+                self.writes += 1
+                entries = self._ensure()
+                for key, value in merged.items():
+                    entries.setdefault(key, value)
+                self._trim(entries)
+
+    def _save(self, entries: OrderedDict):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning(f"No se pudo guardar {self.path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries) if self._entries is not None else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "measured": self.measured,
+                "pending": len(self._pending),
+                "writes": self.writes,
+            }
+
+
+loudness_cache = LoudnessCache(
+    Config.LOUDNESS_CACHE_PATH,
+    target=Config.LOUDNESS_TARGET,
+    max_boost=Config.LOUDNESS_MAX_BOOST,
+    size=Config.LOUDNESS_CACHE_SIZE,
+    flush_delay=Config.LOUDNESS_FLUSH_DELAY,
+)
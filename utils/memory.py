@@ -0,0 +1,55 @@
+"""
+Medición aproximada de memoria del estado por servidor
+"""
+
+import gc
+import sys
+from collections import Counter
+from typing import Iterable
+
+_LEAF_TYPES = (str, bytes, int, float, bool, type(None))
+_CONTAINER_TYPES = (list, tuple, set, frozenset, dict)
+
+
+def deep_sizeof(root, *, classes: tuple = ()) -> int:
+    """
+    Bytes de root y de todo lo que cuelga de él, recorriendo solo
+    contenedores básicos y las clases indicadas (con __dict__ o __slots__).
+    Cualquier otra referencia (Member, Guild, el bot...) se ignora: así no se
+    cuenta medio proceso a través de un puntero.
+    """
+    seen = set()
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, _LEAF_TYPES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, _CONTAINER_TYPES):
+            stack.extend(obj)
+        elif isinstance(obj, classes):
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if slot != "__dict__" and hasattr(obj, slot):
+                        stack.append(getattr(obj, slot))
+    return total
+
+
+def live_objects(classes: Iterable[type]) -> Counter:
+    """Instancias vivas de cada clase (recorre el heap: solo para informes)"""
+    classes = tuple(classes)
+    counts = Counter({cls.__name__: 0 for cls in classes})
+    for obj in gc.get_objects():
+        if isinstance(obj, classes):
+            counts[type(obj).__name__] += 1
+    return counts
@@ -2,41 +2,108 @@
 Sistema de cola de música
 """
 
+import math
 import random
-from collections import deque
+import sys
 from typing import Optional, List
+from config import Config
+from utils.indexed_list import IndexedList
+from utils.filters import FilterChain
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def format_seconds(value: float) -> str:
+    """Segundos como HH:MM:SS o MM:SS"""
+    minutes, seconds = divmod(int(value), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_seconds(text: str) -> Optional[float]:
+    """
+    '90', '1:30' o '1:02:03' → segundos (None si no es válido). NaN e
+    infinito no son válidos: acabarían en un -ss que FFmpeg rechaza.
+
+    >>> parse_seconds("1:30")
+    90.0
+    >>> parse_seconds("inf") is None, parse_seconds("1e999") is None
+    (True, True)
+    """
+    try:
+        parts = [float(p) for p in text.strip().split(":")]
+    except ValueError:
+        return None
+    if not 1 <= len(parts) <= 3 or any(p < 0 or not math.isfinite(p) for p in parts):
+        return None
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds if math.isfinite(seconds) else None  # '1e307:0:0'
 
 
 class Song:
-    """Representa una canción en la cola"""
+    """
+    Representa una canción en la cola.
+
+    Registro compacto (__slots__) que solo guarda el ID de quien la pidió:
+    no retiene el discord.Member (ni su servidor) mientras la canción está
+    en cola o en loop. Las cadenas se internan, así la misma canción en
+    varios servidores (o url == webpage_url) comparte una sola copia.
+    """
+
+    __slots__ = (
+        "url",
+        "title",
+        "duration",
+        "thumbnail",
+        "webpage_url",
+        "requester_id",
+    )
 
     def __init__(self, data: dict):
-        self.url = data.get("url")
-        self.title = data.get("title", "Desconocido")
-        self.duration = data.get("duration", 0)
-        self.thumbnail = data.get("thumbnail")
-        self.requester = data.get("requester")
-        self.webpage_url = data.get("webpage_url")
+        self.url = _intern(data.get("url"))
+        self.title = _intern(data.get("title", "Desconocido"))
+        self.duration = int(data.get("duration") or 0)
+        self.thumbnail = _intern(data.get("thumbnail"))
+        self.webpage_url = _intern(data.get("webpage_url"))
+
+        # Acepta también un discord.Member en "requester", pero solo guarda su ID
+        requester_id = data.get("requester_id")
+        if requester_id is None and data.get("requester") is not None:
+            requester_id = data["requester"].id
+        self.requester_id: Optional[int] = requester_id
+
+    @property
+    def requester_mention(self) -> str:
+        """Mención de quien la pidió; Discord la resuelve al mostrar el embed"""
+        if self.requester_id is None:
+            return "Desconocido"
+        return f"<@{self.requester_id}>"
 
     def format_duration(self) -> str:
         """Formatea la duración como HH:MM:SS o MM:SS"""
         if not self.duration:
             return "Desconocido"
-        minutes, seconds = divmod(int(self.duration), 60)
-        hours, minutes = divmod(minutes, 60)
-        if hours > 0:
-            return f"{hours}:{minutes:02d}:{seconds:02d}"
-        return f"{minutes}:{seconds:02d}"
+        return format_seconds(self.duration)
 
 
 class MusicQueue:
     """Cola de reproducción por servidor"""
 
     def __init__(self):
-        self._queue: deque = deque()
+        self._queue: IndexedList = IndexedList()
         self.current: Optional[Song] = None
         self.loop: bool = False  # loop de la canción actual
         self.loop_queue: bool = False  # loop de toda la cola
+        self.volume: float = Config.DEFAULT_VOLUME  # se conserva entre canciones
+        # None = transiciones clásicas, 0 = gapless, > 0 = segundos de fundido
+        self.crossfade: Optional[float] = None
+        self.filters: FilterChain = FilterChain()  # !filter / !eq
 
     # ── Consultas ─────────────────────────────
 
@@ -49,6 +116,27 @@ class MusicQueue:
     def get_queue(self) -> List[Song]:
         return list(self._queue)
 
+    def page(self, start: int, count: int) -> List[Song]:
+        """Canciones [start, start + count) sin copiar el resto de la cola"""
+        return self._queue.slice(start, start + count)
+
+    def get(self, index: int) -> Optional[Song]:
+        """Canción en la posición index (0-based) o None"""
+        try:
+            return self._queue[index]
+        except (IndexError, TypeError):
+            return None
+
+    def peek_next(self) -> Optional[Song]:
+        """Devuelve lo que devolvería next() sin modificar la cola."""
+        if self.loop and self.current:
+            return self.current
+        if self._queue:
+            return self._queue[0]
+        if self.loop_queue and self.current:
+            return self.current
+        return None
+
     # ── Escritura ─────────────────────────────
 
     def add(self, song: Song) -> int:
@@ -89,17 +177,28 @@ class MusicQueue:
 
     def remove(self, index: int) -> bool:
         """Elimina la canción en la posición index (0-based)."""
+        return self.pop(index) is not None
+
+    def pop(self, index: int) -> Optional[Song]:
+        """Quita y devuelve la canción en la posición index (0-based) o None"""
         try:
-            del self._queue[index]
-            return True
+            return self._queue.pop(index)
         except (IndexError, TypeError):
+            return None
+
+    def move(self, src: int, dst: int) -> bool:
+        """Mueve la canción de la posición src a dst (0-based)."""
+        size = len(self._queue)
+        if not (0 <= src < size and 0 <= dst < size):
             return False
+        self._queue.move(src, dst)
+        return True
 
     def shuffle(self) -> int:
         """Mezcla aleatoriamente la cola. Devuelve el número de canciones."""
         lst = list(self._queue)
         random.shuffle(lst)
-        self._queue = deque(lst)
+        self._queue.reload(lst)
         return len(lst)
 
     def clear_queue_only(self) -> int:
@@ -0,0 +1,249 @@
+"""
+Mensajes salientes de música: un solo "Reproduciendo" por servidor,
+avisos de cola agrupados y envíos ordenados por prioridad
+"""
+
+import asyncio
+import itertools
+import logging
+from enum import IntEnum
+from functools import partial
+from typing import Optional
+import discord
+from config import Config
+
+log = logging.getLogger("notifier")
+
+
+class MessagePriority(IntEnum):
+    """Orden de salida (menor = antes)"""
+
+    REPLY = 0  # errores y avisos del reproductor
+    NOW_PLAYING = 1  # embed de "Reproduciendo"
+    QUEUE = 2  # "Agregado a la cola"
+
+
+class _GuildState:
+    __slots__ = (
+        "np_message",
+        "np_embed",
+        "np_channel",
+        "np_scheduled",
+        "adds",
+        "adds_channel",
+        "adds_scheduled",
+    )
+
+    def __init__(self):
+        self.np_message: Optional[discord.Message] = None
+        self.np_embed: Optional[discord.Embed] = None
+        self.np_channel = None
+        self.np_scheduled = False
+        self.adds: list = []  # (song, posición, mensaje "Buscando..." o None)
+        self.adds_channel = None
+        self.adds_scheduled = False
+
+
+class Notifier:
+    """
+    Capa de salida de mensajes de música.
+
+    - now_playing(): el embed se retrasa NOTIFY_DEBOUNCE segundos y solo sale
+      el último (saltos rápidos, canciones cortas en bucle). Si el mensaje
+      anterior sigue siendo el último del canal se edita en vez de enviar
+      uno nuevo.
+    - queued(): los "Agregado a la cola" que llegan dentro de la ventana se
+      funden en un único embed.
+    - Todo sale por una cola de prioridad atendida por NOTIFY_WORKERS tareas:
+      un 429 de Discord frena a un trabajador, no a los comandos, y los
+      avisos del reproductor adelantan a los de cola.
+    """
+
+    def __init__(self, *, workers: int, debounce: float):
+        self.workers = workers
+        self.debounce = debounce
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._seq = itertools.count()  # desempate FIFO dentro de cada prioridad
+        self._guilds: dict[int, _GuildState] = {}
+
+        self.sent = 0
+        self.edited = 0
+        self.deleted = 0
+        self.coalesced = 0  # mensajes que no llegaron a enviarse
+        self.failed = 0
+
+    # ── Interfaz ──────────────────────────────
+
+    def send(
+        self, channel, content: str = None, *, priority=MessagePriority.REPLY, **kwargs
+    ):
+        """Envía un mensaje sin esperar a Discord"""
+        self._submit(priority, partial(self._send, channel, content, **kwargs))
+
+    def now_playing(self, guild_id: int, channel, embed: discord.Embed):
+        """Actualiza el mensaje de "Reproduciendo" del servidor"""
+        state = self._state(guild_id)
+        if state.np_embed is not None:
+            self.coalesced += 1  # el pendiente queda sustituido
+        state.np_embed = embed
+        state.np_channel = channel
+        if not state.np_scheduled:
+            state.np_scheduled = True
+            self._later(
+                MessagePriority.NOW_PLAYING,
+                partial(self._flush_now_playing, guild_id),
+            )
+
+    def queued(self, guild_id: int, channel, song, position: int, message=None):
+        """
+        Avisa de una canción encolada. message es el "Buscando..." del
+        comando, si llegó a enviarse: se reutiliza en lugar de enviar otro.
+        """
+        state = self._state(guild_id)
+        state.adds.append((song, position, message))
+        state.adds_channel = channel
+        if not state.adds_scheduled:
+            state.adds_scheduled = True
+            self._later(MessagePriority.QUEUE, partial(self._flush_queued, guild_id))
+
+    def forget(self, guild_id: int):
+        """Olvida el estado de un servidor (expulsado del servidor)"""
+        self._guilds.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "edited": self.edited,
+            "deleted": self.deleted,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "pending": self._queue.qsize() if self._queue else 0,
+        }
+
+    # ── Cola de salida ────────────────────────
+
+    def _state(self, guild_id: int) -> _GuildState:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildState()
+        return state
+
+    def _later(self, priority: MessagePriority, job):
+        asyncio.get_running_loop().call_later(
+            self.debounce, self._submit, priority, job
+        )
+
+    def _submit(self, priority: MessagePriority, job):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.get_running_loop().create_task(self._worker()))
+        self._queue.put_nowait((priority, next(self._seq), job))
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except discord.HTTPException as e:
+                self.failed += 1
+                log.warning(f"No se pudo enviar un aviso: {e}")
+            except Exception as e:
+                self.failed += 1
+                log.error(f"Aviso fallido: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, channel, content=None, **kwargs):
+        message = await channel.send(content, **kwargs)
+        self.sent += 1
+        return message
+
+    # ── Trabajos agrupados ────────────────────
+
+    async def _flush_now_playing(self, guild_id: int):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            return
+        embed, state.np_embed = state.np_embed, None
+        state.np_scheduled = False
+        channel = state.np_channel
+        if embed is None:
+            return
+
+        message = state.np_message
+        if (
+            message is not None
+            and message.channel.id == channel.id
+            and getattr(channel, "last_message_id", None) == message.id
+        ):
+            try:
+                await message.edit(embed=embed)
+                self.edited += 1
+                return
+            except discord.NotFound:
+                pass  # lo borraron: enviar uno nuevo
+        state.np_message = await self._send(channel, embed=embed)
+
+    async def _flush_queued(self, guild_id: int):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            return
+        adds, state.adds = state.adds, []
+        state.adds_scheduled = False
+        if not adds:
+            return
+
+        embed = _queued_embed(adds)
+        messages = [message for _, _, message in adds if message is not None]
+        target = messages.pop() if messages else None
+        for stale in messages:
+            try:
+                await stale.delete()
+                self.deleted += 1
+            except discord.NotFound:
+                pass
+        self.coalesced += len(adds) - 1 - len(messages)
+
+        if target is not None:
+            try:
+                await target.edit(content=None, embed=embed)
+                self.edited += 1
+                return
+            except discord.NotFound:
+                pass
+        await self._send(state.adds_channel, embed=embed)
+
+
+def _queued_embed(adds: list) -> discord.Embed:
+    if len(adds) == 1:
+        song, position, _ = adds[0]
+        embed = discord.Embed(
+            title=f"{Config.EMOJI_QUEUE} Agregado a la cola",
+            description=f"**[{song.title}]({song.webpage_url})**",
+            color=Config.COLOR_INFO,
+        )
+        embed.add_field(name="Posición", value=f"#{position}", inline=True)
+        embed.add_field(name="Duración", value=song.format_duration(), inline=True)
+        if song.thumbnail:
+            embed.set_thumbnail(url=song.thumbnail)
+        return embed
+
+    lines = [
+        f"`#{position}` {song.title} ({song.format_duration()})"
+        for song, position, _ in adds[:10]
+    ]
+    if len(adds) > 10:
+        lines.append(f"... y {len(adds) - 10} más")
+    return discord.Embed(
+        title=f"{Config.EMOJI_QUEUE} {len(adds)} canciones agregadas a la cola",
+        description="\n".join(lines),
+        color=Config.COLOR_INFO,
+    )
+
+
+notifier = Notifier(workers=Config.NOTIFY_WORKERS, debounce=Config.NOTIFY_DEBOUNCE)
@@ -0,0 +1,581 @@
+"""
+Reproductor por servidor: un actor con buzón que controla todo el ciclo de
+vida de las canciones
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from functools import partial
+from typing import Awaitable, Callable, Optional
+import discord
+from config import Config
+from utils.music_queue import MusicQueue, Song
+from utils.prefetch import Prefetcher
+from utils.youtube import YTDLSource, swap_source
+from utils.scheduler import Priority
+from utils.timers import idle_timers
+from utils.transitions import TransitionSource
+from utils.formats import DEFAULT_TARGET_KBPS, target_kbps
+from utils.notifier import notifier
+from utils.filters import FilterChain
+
+log = logging.getLogger("player")
+
+
+class GuildPlayer:
+    """
+    Actor por servidor: un buzón (asyncio.Queue) y una sola tarea que lo vacía.
+
+    - Todo cambio de estado del servidor es una carta: empezar canción, fin
+      de canción, cambio gapless, plazo de inactividad y los comandos (vía
+      call()). Se aplican de una en una y en orden, sin locks: ningún comando
+      ve a medias el arranque de una canción ni el fin de la anterior.
+    - Servidores distintos tienen buzones y tareas distintas: no se esperan.
+    - El callback after de discord.py (hilo de audio) solo deja su carta con
+      call_soon_threadsafe; nunca bloquea ese hilo.
+    - Lo lento que no toca el estado sigue fuera del buzón: búsquedas,
+      precarga, la siguiente fuente gapless y la carga de cada canción
+      (yt-dlp + FFmpeg), que vuelve como carta "loaded". !stop, !leave y
+      !skip no la esperan: la abandonan con cancel_load().
+    - Los errores pasan a la siguiente canción dentro de la misma carta, sin
+      recursión.
+    """
+
+    def __init__(
+        self,
+        queue: MusicQueue,
+        prefetcher: Prefetcher,
+        *,
+        guild_id: int,
+        loop: asyncio.AbstractEventLoop,
+        announce: Callable[[object, Song], Awaitable[None]],
+    ):
+        self.queue = queue
+        self.prefetcher = prefetcher
+        self.guild_id = guild_id
+        self.loop = loop
+        self.announce = announce
+        self.ctx = None  # último contexto: canal de texto y voice_client
+        self.bitrate: Optional[int] = None  # kbps del canal de voz
+
+        # Cartas: (tipo, datos, future del que espera o None, instante de envío)
+        self._mailbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._wake_posted = False  # varios wake() seguidos = una sola carta
+        self._closed = False
+
+        # Métricas del buzón (!stats)
+        self.depth_max = 0
+        self.calls = 0
+        self.latency_total = 0.0  # envío → resultado de cada call()
+        self.latency_max = 0.0
+
+        # Modo gapless / crossfade (queue.crossfade is not None)
+        self._song: Optional[Song] = None  # lo que suena ahora mismo
+        self._transition: Optional[TransitionSource] = None
+        self._prepare_task: Optional[asyncio.Task] = None
+
+        # Carga de la siguiente canción: corre fuera del buzón y vuelve como
+        # carta "loaded"; _load_seq descarta las que llegan tras cancelarla
+        self._load_task: Optional[asyncio.Task] = None
+        self._load_seq = 0
+        self._replayed: Optional[Song] = None  # ya relanzada tras un corte
+
+    # ── Interfaz para los comandos ────────────
+
+    def wake(self, ctx):
+        """Avisa de que puede haber algo nuevo que reproducir (no espera)"""
+        self.ctx = ctx
+        if not self._wake_posted:
+            self._wake_posted = True
+            self._post("wake")
+
+    async def call(self, fn: Callable, *args):
+        """
+        Ejecuta fn(*args) (función o corrutina) dentro del buzón y devuelve
+        su resultado o su excepción. fn no debe volver a llamar a call() del
+        mismo servidor: se esperaría a sí misma.
+        """
+        future = self.loop.create_future()
+        self._post("call", (fn, args), future)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._mailbox.qsize(),
+            "depth_max": self.depth_max,
+            "calls": self.calls,
+            "avg_ms": self.latency_total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.latency_max * 1000,
+        }
+
+    # Los métodos siguientes cambian el estado: los comandos los usan a
+    # través de call()
+
+    @property
+    def loading(self) -> bool:
+        """Hay una canción cargándose (aún no suena)"""
+        return self._load_task is not None
+
+    def cancel_load(self) -> bool:
+        """Abandona la carga en curso (!stop, !leave, !skip mientras carga)"""
+        if self._load_task is None:
+            return False
+        self._load_task.cancel()
+        self._load_task = None
+        self._load_seq += 1
+        return True
+
+    def refresh(self):
+        """
+        Tras un cambio en la cola: rehace la precarga y, si la siguiente
+        fuente ya lanzada ya no es la que toca, la descarta y la prepara de nuevo.
+        """
+        transition = self._transition
+        if transition is None or self.queue.crossfade is None:
+            self.prefetcher.refresh()
+            return
+        if transition.armed:
+            if transition.next_tag is self.queue.peek_next():
+                return  # la siguiente ya está lanzada: no precargarla otra vez
+            transition.disarm()
+        self.prefetcher.refresh()
+        self._schedule_prepare()
+
+    def set_crossfade(self, seconds: Optional[float]):
+        """None = transiciones clásicas, 0 = gapless, > 0 = fundido cruzado"""
+        self.queue.crossfade = seconds
+        transition = self._transition
+        if transition is None:
+            return  # se aplica desde la próxima canción
+        if seconds is None:
+            self._cancel_prepare()
+            transition.disarm()
+        else:
+            transition.fade = seconds
+            self._schedule_prepare()
+
+    async def seek(self, position: float, *, relative: bool = False) -> Optional[float]:
+        """
+        Salta a position (segundos) de la canción actual relanzando FFmpeg
+        sobre la URL de stream ya resuelta (sin yt-dlp, salvo que haya
+        caducado). relative=True suma position a donde va ahora.
+        Devuelve la posición aplicada o None si no hay nada sonando.
+        """
+        vc = self._voice_client()
+        source = vc.source if vc else None
+        if source is None or not hasattr(source, "restart"):
+            return None
+
+        if relative:
+            position += source.position
+
+        duration = getattr(source, "duration", None)
+        if duration:
+            position = min(position, max(0.0, duration - 1))
+        position = max(0.0, position)
+
+        if not await self._restart(start=position):
+            return None
+        return position
+
+    async def set_filters(self, filters: FilterChain) -> bool:
+        """
+        Cambia los filtros del servidor. La siguiente canción (precargada o
+        armada) se rehace con ellos y, si algo suena, se relanza su FFmpeg en
+        la posición actual. Devuelve True si se aplicaron ya.
+        """
+        self.queue.filters = filters
+        self.prefetcher.cancel()
+        if self._transition is not None:
+            self._transition.disarm()
+        self.refresh()
+        return await self._restart()
+
+    async def _restart(self, start: Optional[float] = None) -> bool:
+        """Relanza FFmpeg de lo que suena (en start o donde va) sin yt-dlp"""
+        vc = self._voice_client()
+        source = vc.source if vc else None
+        if source is None or not hasattr(source, "restart"):
+            return False
+
+        data = None
+        if source.stream_expired() and self._song is not None:
+            data = await YTDLSource.resolve(
+                self._song.url, guild_id=self.guild_id, priority=Priority.PLAY_NOW
+            )
+            vc = self._voice_client()
+            if vc is None or vc.source is not source:
+                return False  # la canción cambió mientras se resolvía
+
+        fresh = source.restart(start=start, data=data, filters=self.queue.filters)
+        swap_source(vc, fresh, loop=self.loop)
+        if self._transition is not None and self.queue.crossfade is not None:
+            # El tiempo restante cambió: replanificar la siguiente fuente
+            self._transition.disarm()
+            self._schedule_prepare()
+        return True
+
+    def close(self):
+        """Detiene el actor (el servidor se eliminó o el cog se descarga)"""
+        self._closed = True
+        idle_timers.cancel(self.guild_id)
+        self._cancel_prepare()
+        self.cancel_load()
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        while not self._mailbox.empty():
+            future = self._mailbox.get_nowait()[2]
+            if future is not None:
+                future.cancel()
+
+    # ── Buzón ─────────────────────────────────
+
+    def _post(self, kind: str, payload=None, future: Optional[asyncio.Future] = None):
+        if self._closed:
+            if future is not None:
+                future.cancel()
+            return
+        self._mailbox.put_nowait((kind, payload, future, time.monotonic()))
+        self.depth_max = max(self.depth_max, self._mailbox.qsize())
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._deliver(*await self._mailbox.get())
+
+    async def _deliver(self, kind: str, payload, future, posted: float):
+        """Aplica una carta; hasta que acaba no se lee la siguiente"""
+        if future is not None and future.cancelled():
+            return  # quien esperaba ya se fue
+        try:
+            if kind == "call":
+                fn, args = payload
+                result = fn(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                if not future.done():
+                    future.set_result(result)
+            elif kind == "wake":
+                self._wake_posted = False
+                await self._advance()
+            elif kind == "track_end":
+                await self._on_track_end(payload)
+            elif kind == "loaded":
+                await self._on_loaded(*payload)
+            elif kind == "switch":
+                self._on_switch(payload)
+            elif kind == "idle":
+                await self._disconnect_idle()
+        except asyncio.CancelledError:
+            if future is not None:
+                future.cancel()
+            raise
+        except Exception as e:
+            if future is not None and not future.done():
+                future.set_exception(e)
+            else:
+                log.error(f"GuildPlayer {self.guild_id} ({kind}): {e!r}")
+        finally:
+            if kind == "call":
+                latency = time.monotonic() - posted
+                self.calls += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+
+    # ── Reproducción ──────────────────────────
+
+    def _after(self, error: Optional[Exception]):
+        """Callback de discord.py: corre en el hilo de audio"""
+        self.loop.call_soon_threadsafe(self._post, "track_end", error)
+
+    def _voice_client(self):
+        vc = self.ctx.voice_client if self.ctx else None
+        return vc if vc and vc.is_connected() else None
+
+    async def _on_track_end(self, error: Optional[Exception]):
+        vc = self._voice_client()
+        if vc is not None and (vc.is_playing() or vc.is_paused()):
+            return  # fin atrasado (p. ej. !stop y !play seguidos): ya suena otra
+        ended = vc.source if vc is not None else None
+        self._cancel_prepare()
+        self._transition = None
+        if error:
+            log.error(f"after_playing: {error}")
+            if self._song is not None:
+                YTDLSource.invalidate(self._song.url)
+        elif self._replay_if_cut(ended):
+            return
+        await self._advance()
+
+    def _replay_if_cut(self, source) -> bool:
+        """
+        Si source se cortó a los pocos segundos (URL de stream caducada), la
+        descarta y vuelve a cargar la misma canción, una vez por canción.
+        Devuelve True si la relanzó.
+        """
+        song = self._song
+        ended_early = getattr(source, "ended_early", None)
+        if song is None or ended_early is None or not ended_early():
+            self._replayed = None
+            return False
+        if self._replayed is song or self._load_task is not None:
+            return False  # ya se reintentó: pasar a la siguiente
+
+        log.warning(
+            f"{song.title} se cortó a los {source.position:.1f}s: "
+            f"se vuelve a resolver la URL de stream"
+        )
+        YTDLSource.invalidate(song.url)
+        self._replayed = song
+        self.queue.current = song
+        self._begin_load(song)
+        return True
+
+    async def _advance(self):
+        idle_timers.cancel(self.guild_id)
+        if await self._start_next():
+            # Cola vacía → plazo de inactividad en la rueda compartida;
+            # cualquier wake() o fin de canción lo cancela
+            idle_timers.arm(
+                self.guild_id, Config.INACTIVITY_TIMEOUT, self._on_idle_timeout
+            )
+
+    def _on_idle_timeout(self):
+        self._post("idle")
+
+    async def _start_next(self) -> bool:
+        """
+        Saca la siguiente canción y lanza su carga fuera del buzón; sonará al
+        llegar la carta "loaded". Devuelve True si quedó conectado sin nada
+        que reproducir.
+        """
+        if self._load_task is not None:
+            return False  # ya hay una cargándose
+        vc = self._voice_client()
+        if vc is None:
+            log.info("GuildPlayer: bot no conectado")
+            self.queue.current = None
+            return False
+        if vc.is_playing() or vc.is_paused():
+            return False
+
+        # Formato y codificación según el bitrate del canal actual
+        self.bitrate = target_kbps(vc)
+        self.prefetcher.bitrate = self.bitrate
+
+        song = self.queue.next()
+        if song is None:
+            return True
+
+        self._begin_load(song)
+        return False
+
+    def _begin_load(self, song: Song):
+        self._load_seq += 1
+        self._load_task = self.loop.create_task(
+            self._load_and_post(song, self._load_seq)
+        )
+
+    async def _load_and_post(self, song: Song, seq: int):
+        source = await self._load(song)
+        self._post("loaded", (song, source, seq))
+
+    async def _on_loaded(self, song: Song, source, seq: int):
+        """Carta "loaded": la canción cargada empieza a sonar"""
+        if seq != self._load_seq:
+            # Carga cancelada (!stop, !skip) que terminó de todos modos
+            if source is not None:
+                source.cleanup()
+            return
+        self._load_task = None
+
+        if source is None:
+            # Falló la carga (ya avisado): pasar a la siguiente
+            self.queue.current = None
+            await self._advance()
+            return
+
+        vc = self._voice_client()
+        if vc is None:
+            log.info("Conexión perdida antes de reproducir")
+            source.cleanup()
+            self.queue.current = None
+            return
+
+        source = self._match_settings(source)
+        if self.queue.crossfade is not None:
+            source = TransitionSource(
+                source,
+                fade=self.queue.crossfade,
+                loop=self.loop,
+                on_switch=partial(self._post, "switch"),
+            )
+
+        self._song = song
+        try:
+            vc.play(
+                source,
+                after=self._after,
+                bitrate=self.bitrate or DEFAULT_TARGET_KBPS,
+            )
+        except discord.errors.ClientException as e:
+            source.cleanup()
+            if "Not connected to voice" in str(e):
+                notifier.send(
+                    self.ctx.channel,
+                    f"{Config.EMOJI_ERROR} Me desconectaron del canal. Usa `!join`.",
+                )
+            else:
+                log.error(f"ClientException al reproducir: {e}")
+            self.queue.current = None
+            return
+
+        self._transition = source if isinstance(source, TransitionSource) else None
+        self.prefetcher.refresh()
+        if self._transition is not None:
+            self._schedule_prepare()
+        await self._announce(song)
+
+    async def _announce(self, song: Song):
+        try:
+            await self.announce(self.ctx, song)
+        except discord.HTTPException as e:
+            log.warning(f"No se pudo anunciar la canción: {e}")
+
+    # ── Gapless / crossfade ───────────────────
+
+    def _schedule_prepare(self):
+        self._cancel_prepare()
+        self._prepare_task = self.loop.create_task(self._prepare_next())
+
+    def _cancel_prepare(self):
+        if self._prepare_task and not self._prepare_task.done():
+            self._prepare_task.cancel()
+        self._prepare_task = None
+
+    async def _prepare_next(self):
+        """
+        Lanza el FFmpeg de la siguiente canción GAPLESS_LEAD segundos antes
+        de que empiece el fundido y lo deja armado en la transición.
+        """
+        transition = self._transition
+        if transition is None:
+            return
+
+        # Esperar en tramos: una pausa estira el tiempo restante
+        while True:
+            remaining = transition.remaining()
+            if remaining is None:
+                return  # sin duración (directo): transición clásica
+            wait = remaining - transition.fade - Config.GAPLESS_LEAD
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, 5.0))
+
+        song = self.queue.peek_next()
+        if song is None or self._transition is not transition:
+            return
+        try:
+            source = await self.prefetcher.take(song, Priority.PREFETCH)
+            if source is not None and source.volume != self.queue.volume:
+                if source.live_volume:
+                    source.volume = self.queue.volume
+                else:
+                    source.cleanup()
+                    source = None
+            if source is None:
+                source = await YTDLSource.from_url(
+                    song.url,
+                    volume=self.queue.volume,
+                    guild_id=self.guild_id,
+                    priority=Priority.PREFETCH,
+                    bitrate=self.bitrate,
+                    filters=self.queue.filters,
+                    title=song.title,
+                    duration=song.duration,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # No es fatal: al terminar la canción se carga por el camino normal
+            log.warning(f"No se pudo preparar {song.title} para gapless: {e}")
+            return
+
+        if self._transition is transition and self.queue.peek_next() is song:
+            transition.arm(source, song)
+        else:
+            source.cleanup()
+
+    def _on_switch(self, song: Optional[Song]):
+        """La transición pasó a la siguiente canción sin cortar el audio"""
+        if self._transition is None or song is None:
+            return
+        if self.queue.peek_next() is song:
+            self.queue.next()
+        else:
+            # La cola cambió justo durante el cambio: reflejar lo que suena
+            self.queue.current = song
+        self._song = song
+        self.prefetcher.refresh()
+        self._schedule_prepare()
+        self.loop.create_task(self._announce(song))
+
+    async def _load(self, song: Song):
+        """
+        Fuente para song (precargada o recién creada) o None si falla.
+        Corre fuera del buzón: no toca la cola ni el voice_client.
+        """
+        try:
+            source = await self.prefetcher.take(song)
+            if source is None:
+                source = await YTDLSource.from_url(
+                    song.url,
+                    stream=True,
+                    volume=self.queue.volume,
+                    guild_id=self.guild_id,
+                    bitrate=self.bitrate,
+                    filters=self.queue.filters,
+                    title=song.title,
+                    duration=song.duration,
+                )
+            return source
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Error cargando {song.title}: {e}")
+            YTDLSource.invalidate(song.url)
+            if self.ctx:
+                notifier.send(
+                    self.ctx.channel,
+                    f"{Config.EMOJI_ERROR} Error al reproducir, saltando...",
+                )
+            await asyncio.sleep(1)
+            return None
+
+    def _match_settings(self, source):
+        """Rehace source si filtros o volumen cambiaron mientras cargaba"""
+        if source.filters != self.queue.filters:
+            stale, source = source, source.restart(filters=self.queue.filters)
+            stale.cleanup()
+        if source.volume != self.queue.volume:
+            if source.live_volume:
+                source.volume = self.queue.volume
+            else:
+                stale, source = source, source.restart(volume=self.queue.volume)
+                stale.cleanup()
+        return source
+
+    async def _disconnect_idle(self):
+        vc = self._voice_client()
+        if self.queue.is_empty() and vc and not vc.is_playing() and not vc.is_paused():
+            notifier.send(
+                self.ctx.channel,
+                f"{Config.EMOJI_INFO} Cola vacía. Desconectando por inactividad...",
+            )
+            await vc.disconnect()
@@ -0,0 +1,122 @@
+"""
+Precarga de la siguiente canción mientras suena la actual
+"""
+
+import asyncio
+import logging
+from typing import Optional
+from config import Config
+from utils.music_queue import MusicQueue, Song
+from utils.youtube import YTDLSource, extract_video_id
+from utils.audio_cache import audio_cache
+from utils.scheduler import Priority
+
+log = logging.getLogger("prefetch")
+
+
+class Prefetcher:
+    """
+    Resuelve por adelantado la canción que sonará a continuación en un servidor.
+
+    - Siempre deja la URL de stream resuelta en la caché de youtube.py.
+    - Con Config.PREFETCH_SPAWN_FFMPEG además arranca FFmpeg, de modo que
+      GuildPlayer solo tiene que tomar la fuente ya lista.
+
+    Tras cualquier cambio en la cola hay que llamar a refresh(): si la
+    siguiente canción cambió, la precarga anterior se cancela y se rehace.
+    """
+
+    def __init__(self, queue: MusicQueue, *, guild_id: int, loop):
+        self.queue = queue
+        self.guild_id = guild_id
+        self.loop = loop
+        self._song: Optional[Song] = None
+        self._task: Optional[asyncio.Task] = None
+        self._source: Optional[YTDLSource] = None
+        self._priority = Priority.PREFETCH  # sube si alguien la espera (take)
+        self.bitrate: Optional[int] = None  # kbps del canal (lo fija GuildPlayer)
+
+    def refresh(self):
+        """Alinea la precarga con la canción que devolvería queue.next()"""
+        target = self.queue.peek_next()
+        if target is self._song:
+            return
+
+        self.cancel()
+        if target is None:
+            return
+
+        self._song = target
+        self._priority = Priority.PREFETCH
+        self._task = self.loop.create_task(self._run(target))
+
+    async def _run(self, song: Song):
+        try:
+            if Config.PREFETCH_SPAWN_FFMPEG:
+                source = await YTDLSource.from_url(
+                    song.url,
+                    volume=self.queue.volume,
+                    guild_id=self.guild_id,
+                    priority=self._priority,
+                    bitrate=self.bitrate,
+                    filters=self.queue.filters,
+                    title=song.title,
+                    duration=song.duration,
+                )
+                if self._song is song:
+                    self._source = source
+                else:
+                    source.cleanup()
+            elif not audio_cache.has(extract_video_id(song.url)):
+                await YTDLSource.resolve(
+                    song.url, guild_id=self.guild_id, priority=self._priority
+                )
+            log.info(f"Precargada: {song.title}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # No es fatal: GuildPlayer volverá a intentarlo al llegar su turno
+            log.warning(f"Precarga falló ({song.title}): {e}")
+
+    async def take(
+        self, song: Song, priority: Priority = Priority.PLAY_NOW
+    ) -> Optional[YTDLSource]:
+        """
+        Devuelve la fuente precargada si corresponde a song (esperando a que
+        termine si aún está en curso). Si no corresponde, descarta la precarga.
+        Mientras espera, la extracción de la precarga pasa a priority: quien
+        llama ya no especula, está esperando a que suene. Si un refresh() o
+        cancel() la descarta durante la espera, devuelve None.
+        """
+        if self._song is not song:
+            self.cancel()
+            return None
+
+        task = self._task
+        if task and not task.done():
+            if priority < self._priority:
+                self._priority = priority  # por si _run aún no la ha encolado
+                YTDLSource.promote(song.url, priority)
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise  # cancelaron a quien espera, no la precarga
+            if self._task is not task:
+                return None  # la cola cambió mientras esperaba: que cargue él
+
+        source = self._source
+        self._source = None
+        self._task = None
+        self._song = None
+        return source
+
+    def cancel(self):
+        """Cancela la precarga en curso y libera el FFmpeg ya lanzado"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        if self._source is not None:
+            self._source.cleanup()
+        self._task = None
+        self._source = None
+        self._song = None
@@ -0,0 +1,173 @@
+"""
+Planificador de extracciones yt-dlp con reparto justo entre servidores
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Hashable, Optional
+from config import Config
+
+log = logging.getLogger("scheduler")
+
+
+class Priority(IntEnum):
+    """Menor valor = se atiende antes"""
+
+    PLAY_NOW = 0  # el usuario está esperando a que empiece a sonar
+    ENQUEUE = 1  # se agrega a la cola mientras suena otra cosa
+    PREFETCH = 2  # precarga especulativa
+
+
+class ExtractionScheduler:
+    """
+    Ejecuta el trabajo bloqueante de yt-dlp en un pool de hilos propio.
+
+    - Concurrencia máxima = workers (Config.EXTRACT_WORKERS).
+    - Cada prioridad tiene una cola por servidor; los servidores se atienden
+      en round-robin, así un servidor que spamea !play no bloquea al resto.
+    - Siempre se atiende primero la prioridad más alta con trabajo pendiente.
+    - Un trabajo con clave puede subir de prioridad mientras espera (promote),
+      p. ej. la precarga de la canción que el usuario ya está esperando.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ytdl"
+        )
+        # prioridad → {guild_id: deque[(future, fn, args, encolado_en, clave)]}
+        self._pending: list[OrderedDict] = [OrderedDict() for _ in Priority]
+        self._active = 0
+
+        # Métricas
+        self.submitted = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.depth_max = 0
+        self.promoted = 0
+
+    def depth(self) -> int:
+        return sum(len(q) for level in self._pending for q in level.values())
+
+    async def run(
+        self,
+        fn,
+        *args,
+        guild_id: Optional[int] = None,
+        priority: Priority = Priority.ENQUEUE,
+        key: Optional[Hashable] = None,
+    ):
+        """
+        Encola fn(*args) y espera su resultado. Con key, promote puede
+        subirlo de prioridad mientras espera.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        level = self._pending[priority]
+        level.setdefault(guild_id, deque()).append(
+            (future, fn, args, time.monotonic(), key)
+        )
+        self.submitted += 1
+        self.depth_max = max(self.depth_max, self.depth())
+
+        self._pump(loop)
+        return await future
+
+    def promote(self, key: Hashable, priority: Priority) -> int:
+        """
+        Pasa a priority los trabajos pendientes con esa clave que esperan en
+        una prioridad más baja. Los que ya corren no cambian. Devuelve cuántos
+        se movieron.
+        """
+        if key is None:
+            return 0
+        moved = 0
+        target = self._pending[priority]
+        for level in self._pending[priority + 1 :]:
+            for guild_id, items in list(level.items()):
+                keep = deque()
+                for item in items:
+                    if item[4] == key and not item[0].done():
+                        target.setdefault(guild_id, deque()).append(item)
+                        moved += 1
+                    else:
+                        keep.append(item)
+                if not keep:
+                    del level[guild_id]
+                elif len(keep) != len(items):
+                    level[guild_id] = keep
+        if moved:
+            self.promoted += moved
+            log.info(f"{moved} extracción(es) subidas a {priority.name}: {key}")
+        return moved
+
+    def _pop_next(self):
+        for level in self._pending:
+            if not level:
+                continue
+            guild_id, items = next(iter(level.items()))
+            item = items.popleft()
+            if items:
+                level.move_to_end(guild_id)  # turno del siguiente servidor
+            else:
+                del level[guild_id]
+            return item
+        return None
+
+    def _pump(self, loop):
+        while self._active < self.workers:
+            item = self._pop_next()
+            if item is None:
+                return
+
+            future, fn, args, queued_at, _ = item
+            if future.done():  # quien esperaba ya se canceló
+                continue
+
+            waited = time.monotonic() - queued_at
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+            self._active += 1
+            work = loop.run_in_executor(self._executor, fn, *args)
+            work.add_done_callback(
+                lambda done, future=future: self._on_done(loop, future, done)
+            )
+
+    def _on_done(self, loop, future: asyncio.Future, done: asyncio.Future):
+        self._active -= 1
+        self.completed += 1
+        if not future.done():
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+        self._pump(loop)
+
+    def stats(self) -> dict:
+        started = self.completed + self._active
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            "depth": self.depth(),
+            "depth_by_priority": {
+                p.name: sum(len(q) for q in self._pending[p].values()) for p in Priority
+            },
+            "depth_max": self.depth_max,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "promoted": self.promoted,
+            "avg_wait_ms": self.wait_total / started * 1000 if started else 0.0,
+            "max_wait_ms": self.wait_max * 1000,
+        }
+
+
+extraction_scheduler = ExtractionScheduler(Config.EXTRACT_WORKERS)
@@ -0,0 +1,189 @@
+"""
+Arranque rápido: tiempos por fase y descubrimiento de FFmpeg/Opus con caché
+"""
+
+import ctypes.util
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Optional
+import discord
+from config import Config
+
+log = logging.getLogger("startup")
+
+
+class PhaseTimer:
+    """Mide cada fase del arranque y el tiempo total hasta on_ready"""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, time.perf_counter() - start)
+
+    def mark(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    def ready(self) -> bool:
+        """Registra on_ready. Devuelve False si ya se había registrado."""
+        if self.ready_at is not None:
+            return False
+        self.ready_at = time.perf_counter()
+        return True
+
+    def report(self):
+        lines = [
+            f"  {name:<14} {seconds * 1000:8.1f} ms" for name, seconds in self.phases
+        ]
+        total = (self.ready_at or time.perf_counter()) - self.started_at
+        log.info("Tiempos de arranque:\n" + "\n".join(lines))
+        log.info(f"Time-to-ready: {total * 1000:.0f} ms")
+
+
+# ── Estado persistente entre arranques ────────
+
+
+def _load_state() -> dict:
+    try:
+        with open(Config.RUNTIME_STATE_PATH, encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state: dict):
+    path = Config.RUNTIME_STATE_PATH
+    tmp = f"{path}.{os.getpid()}.tmp"  # varios clusters pueden arrancar a la vez
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.warning(f"No se pudo guardar {path}: {e}")
+
+
+def _fingerprint(path: str) -> Optional[list]:
+    """(mtime, tamaño) del archivo, o None si ya no existe"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _still_valid(entry: Optional[dict], configured: str) -> bool:
+    return (
+        isinstance(entry, dict)
+        and entry.get("configured") == configured
+        and entry.get("fingerprint") is not None
+        and _fingerprint(entry.get("path", "")) == entry["fingerprint"]
+    )
+
+
+# ── Descubrimiento ────────────────────────────
+
+
+def resolve_ffmpeg(state: dict) -> Optional[str]:
+    """
+    Ruta absoluta de FFmpeg. Reutiliza la del arranque anterior si el archivo
+    sigue igual (un stat); si no, la busca en el PATH sin lanzar procesos.
+    """
+    configured = Config.FFMPEG_PATH
+    cached = state.get("ffmpeg")
+    if _still_valid(cached, configured):
+        return cached["path"]
+
+    path = shutil.which(configured)
+    if path is None:
+        state.pop("ffmpeg", None)
+        return None
+    path = os.path.abspath(path)
+    state["ffmpeg"] = {
+        "configured": configured,
+        "path": path,
+        "fingerprint": _fingerprint(path),
+    }
+    return path
+
+
+OPUS_CANDIDATES = [
+    "/nix/var/nix/profiles/default/lib/libopus.so",
+    "/usr/lib/libopus.so.0",
+    "/usr/lib/x86_64-linux-gnu/libopus.so.0",
+    "libopus.so.0",
+    "libopus",
+    "opus",
+]
+
+
+def _try_load_opus(name: str) -> bool:
+    try:
+        discord.opus.load_opus(name)
+    except Exception:
+        return False
+    return discord.opus.is_loaded()
+
+
+def load_opus(state: dict) -> bool:
+    """
+    Carga libopus probando primero la ruta que funcionó la vez anterior,
+    luego ctypes.util.find_library y por último la lista de candidatos.
+    """
+    if discord.opus.is_loaded():
+        return True
+
+    cached = state.get("opus")
+    if isinstance(cached, dict) and cached.get("name"):
+        name = cached["name"]
+        if not os.path.isabs(name) or _fingerprint(name) == cached.get("fingerprint"):
+            if _try_load_opus(name):
+                log.info(f"Opus cargado (caché): {name}")
+                return True
+
+    found = ctypes.util.find_library("opus")
+    for name in ([found] if found else []) + OPUS_CANDIDATES:
+        if _try_load_opus(name):
+            log.info(f"Opus cargado: {name}")
+            state["opus"] = {
+                "name": name,
+                "fingerprint": _fingerprint(name) if os.path.isabs(name) else None,
+            }
+            return True
+
+    state.pop("opus", None)
+    log.warning("Opus no cargado — el audio de voz puede no funcionar")
+    return False
+
+
+def discover(timer: PhaseTimer):
+    """Resuelve Opus y FFmpeg, y persiste lo encontrado para el próximo arranque"""
+    with timer.phase("estado"):
+        state = _load_state()
+        before = json.dumps(state, sort_keys=True)
+
+    with timer.phase("opus"):
+        load_opus(state)
+
+    with timer.phase("ffmpeg"):
+        path = resolve_ffmpeg(state)
+        if path:
+            Config.FFMPEG_PATH = path  # los subprocesos ya no buscan en el PATH
+            log.info(f"ffmpeg path: {path}")
+        else:
+            log.warning(f"FFmpeg no encontrado: {Config.FFMPEG_PATH}")
+
+    if json.dumps(state, sort_keys=True) != before:
+        _save_state(state)
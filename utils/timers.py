@@ -0,0 +1,116 @@
+"""
+Rueda de temporizadores (hashed timer wheel) para plazos por servidor
+"""
+
+import asyncio
+import logging
+import math
+from typing import Callable, Hashable, Optional
+
+log = logging.getLogger("timers")
+
+
+class _Timer:
+    __slots__ = ("key", "slot", "rounds", "callback")
+
+    def __init__(self, key: Hashable, slot: int, rounds: int, callback: Callable):
+        self.key = key
+        self.slot = slot
+        self.rounds = rounds
+        self.callback = callback
+
+
+class TimerWheel:
+    """
+    Plazos con granularidad de `tick` segundos, a lo sumo uno por clave.
+
+    - arm / cancel son O(1): cada temporizador vive en la ranura
+      (cursor + ticks) % slots y guarda cuántas vueltas le faltan.
+    - Una sola tarea avanza el cursor en cada tick para todos los servidores;
+      se detiene sola cuando no queda ningún temporizador armado.
+    - Los callbacks son síncronos y corren en el event loop.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: list[dict] = [{} for _ in range(slots)]
+        self._timers: dict[Hashable, _Timer] = {}
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def arm(self, key: Hashable, delay: float, callback: Callable[[], None]):
+        """Arma (o rearma) el plazo de key para dentro de delay segundos"""
+        self.cancel(key)
+
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._cursor + ticks) % self.slots
+        timer = _Timer(key, slot, (ticks - 1) // self.slots, callback)
+        self._wheel[slot][key] = timer
+        self._timers[key] = timer
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def cancel(self, key: Hashable) -> bool:
+        """Desarma el plazo de key. Devuelve True si estaba armado."""
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del self._wheel[timer.slot][key]
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time() + self.tick
+        while self._timers:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            next_at += self.tick
+            self._advance()
+
+    def _advance(self):
+        self._cursor = (self._cursor + 1) % self.slots
+        bucket = self._wheel[self._cursor]
+        due = []
+        for timer in bucket.values():
+            if timer.rounds:
+                timer.rounds -= 1
+            else:
+                due.append(timer)
+
+        for timer in due:
+            del bucket[timer.key]
+            del self._timers[timer.key]
+            self.fired += 1
+            try:
+                timer.callback()
+            except Exception as e:
+                log.error(f"Temporizador {timer.key!r} falló: {e!r}")
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "armed": len(self._timers),
+            "fired": self.fired,
+            "tick": self.tick,
+            "slots": self.slots,
+        }
+
+
+# Plazos de desconexión por inactividad (clave = guild_id)
+idle_timers = TimerWheel()
+
+# Plazos para liberar el estado de servidores sin actividad (clave = guild_id);
+# son de decenas de minutos: basta con un tick grueso
+state_timers = TimerWheel(tick=30.0)
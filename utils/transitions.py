@@ -0,0 +1,181 @@
+"""
+Transiciones sin silencio (gapless) y con fundido cruzado entre canciones
+"""
+
+import logging
+from typing import Callable, Optional
+import discord
+from utils.volume import FadeMixer
+
+log = logging.getLogger("transitions")
+
+
+class TransitionSource(discord.AudioSource):
+    """
+    Envuelve la fuente que está sonando (YTDLSource / YTDLOpusSource) y una
+    siguiente ya lanzada con arm().
+
+    - Fuera de la ventana de fundido read() devuelve el frame de la fuente
+      actual tal cual: sin copias ni cálculos extra.
+    - Dentro de la ventana (solo PCM) mezcla ambos frames con FadeMixer,
+      bajando una y subiendo la otra linealmente.
+    - Al terminar la actual continúa con la siguiente en el mismo read(),
+      así no se pierde ningún frame de 20 ms. discord.py no se entera del
+      cambio: after_playing solo llega cuando no hay siguiente.
+
+    read() corre en el hilo de audio; arm(), disarm() y restart() en el
+    event loop. El intercambio es una asignación de atributo, y los cleanup()
+    se delegan al event loop para no bloquear el hilo de audio.
+    """
+
+    def __init__(
+        self,
+        source,
+        *,
+        fade: float,
+        loop,
+        on_switch: Callable[[object], None],
+    ):
+        self.current = source
+        self.fade = fade
+        self.loop = loop
+        self.on_switch = on_switch  # se llama en el event loop con el tag armado
+        self._next = None
+        self._next_tag = None
+        self._mixer = FadeMixer()
+        self.switches = 0
+
+    # ── Interfaz para GuildPlayer ─────────────
+
+    @property
+    def armed(self) -> bool:
+        return self._next is not None
+
+    @property
+    def next_tag(self):
+        return self._next_tag
+
+    def arm(self, source, tag):
+        """Deja lista la siguiente fuente (tag vuelve en on_switch)"""
+        self.disarm()
+        self._next_tag = tag
+        self._next = source
+
+    def disarm(self):
+        """Descarta la siguiente fuente (la cola cambió)"""
+        stale, self._next = self._next, None
+        self._next_tag = None
+        if stale is not None:
+            stale.cleanup()
+
+    def remaining(self) -> Optional[float]:
+        """Segundos reales que le quedan a la actual (None si no se sabe)"""
+        duration = getattr(self.current, "duration", None)
+        if not duration:
+            return None
+        tempo = getattr(self.current, "tempo", 1.0)  # nightcore: 1.25
+        return (duration - self.current.position) / tempo
+
+    # ── Proxy de la fuente actual ─────────────
+
+    @property
+    def position(self) -> float:
+        return self.current.position
+
+    @property
+    def live_volume(self) -> bool:
+        return self.current.live_volume
+
+    @property
+    def volume(self) -> float:
+        return self.current.volume
+
+    @volume.setter
+    def volume(self, value: float):
+        self.current.volume = value
+        nxt = self._next
+        if nxt is not None:
+            if nxt.live_volume:
+                nxt.volume = value
+            else:
+                self.disarm()  # su FFmpeg ya tiene el volumen viejo
+
+    @property
+    def duration(self):
+        return getattr(self.current, "duration", None)
+
+    @property
+    def filters(self):
+        return self.current.filters
+
+    def stream_expired(self, margin: float = 30.0) -> bool:
+        return self.current.stream_expired(margin)
+
+    def ended_early(self) -> bool:
+        return self.current.ended_early()
+
+    def restart(
+        self,
+        *,
+        start: Optional[float] = None,
+        volume: Optional[float] = None,
+        data: Optional[dict] = None,
+        filters=None,
+    ):
+        """Reinicia la fuente actual dentro del envoltorio y devuelve self"""
+        fresh = self.current.restart(
+            start=start, volume=volume, data=data, filters=filters
+        )
+        stale, self.current = self.current, fresh
+        self.loop.call_later(0.5, stale.cleanup)
+        if volume is not None and self._next is not None:
+            self.volume = volume
+        return self
+
+    # ── AudioSource ───────────────────────────
+
+    def is_opus(self) -> bool:
+        return self.current.is_opus()
+
+    def read(self) -> bytes:
+        current = self.current
+        data = current.read()
+        nxt = self._next
+        if nxt is None:
+            return data
+
+        if not data:
+            return self._switch(nxt)
+
+        if self.fade <= 0 or current.is_opus():
+            return data
+
+        remaining = self.remaining()
+        if remaining is None or remaining > self.fade:
+            return data
+        if remaining <= 0:
+            return self._switch(nxt)  # la duración declarada se quedó corta
+
+        incoming = nxt.read()
+        if len(incoming) != len(data):
+            return data  # la siguiente aún no entrega (o falló): sin mezclar
+
+        return self._mixer.mix(data, incoming, 1.0 - remaining / self.fade)
+
+    def _switch(self, nxt) -> bytes:
+        stale, self.current = self.current, nxt
+        tag, self._next, self._next_tag = self._next_tag, None, None
+        self.switches += 1
+        self.loop.call_soon_threadsafe(self._after_switch, stale, tag)
+        return nxt.read()
+
+    def _after_switch(self, stale, tag):
+        stale.cleanup()
+        try:
+            self.on_switch(tag)
+        except Exception as e:
+            log.error(f"on_switch falló: {e!r}")
+
+    def cleanup(self) -> None:
+        self.disarm()
+        self.current.cleanup()
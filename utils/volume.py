@@ -0,0 +1,99 @@
+"""
+Etapas de volumen y mezcla para frames PCM (NumPy si está instalado, si no
+audioop)
+"""
+
+import audioop
+from discord.opus import Encoder as OpusEncoder
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sin NumPy se usa audioop
+    np = None
+
+FRAME_SAMPLES = OpusEncoder.SAMPLES_PER_FRAME * OpusEncoder.CHANNELS  # 1920
+
+
+class VolumeStage:
+    """
+    Escala frames s16le de 20 ms.
+
+    - Ganancia 1.0: el frame sale tal cual, sin tocarlo.
+    - Ganancia < 1.0 con NumPy: el frame se lee sin copiarlo (frombuffer) y
+      se escala sobre dos arrays reservados una sola vez por fuente; la única
+      asignación por frame es el bytes final que exige el encoder Opus de
+      discord.py. Al bajar nunca se sale de int16, así que no hay que recortar.
+    - Ganancia > 1.0, sin NumPy o frames de otro tamaño: audioop.mul, como
+      discord.PCMVolumeTransformer (recortar en NumPy no sale más rápido).
+
+    Cada fuente tiene la suya: solo la usa el hilo de audio.
+    """
+
+    __slots__ = ("_work", "_out", "_gain", "_scale")
+
+    def __init__(self):
+        self._gain = None
+        self._scale = None
+        if np is not None:
+            self._work = np.empty(FRAME_SAMPLES, dtype=np.float32)
+            self._out = np.empty(FRAME_SAMPLES, dtype=np.int16)
+
+    def apply(self, frame: bytes, gain: float) -> bytes:
+        if gain == 1.0:
+            return frame
+        if np is None or gain > 1.0 or len(frame) != FRAME_SAMPLES * 2:
+            return audioop.mul(frame, 2, gain)
+
+        if gain != self._gain:
+            self._gain = gain
+            self._scale = np.float32(gain)
+        work = self._work
+        np.multiply(np.frombuffer(frame, dtype=np.int16), self._scale, out=work)
+        out = self._out
+        np.copyto(out, work, casting="unsafe")
+        return out.tobytes()
+
+
+class FadeMixer:
+    """
+    Mezcla dos frames s16le de 20 ms con ganancias complementarias (fundido
+    cruzado): saliente * (1 - gain_in) + entrante * gain_in.
+
+    - Con NumPy los dos frames se leen sin copiarlos y se mezclan sobre
+      arrays reservados una sola vez por transición; como en VolumeStage, la
+      única asignación por frame es el bytes final. Las ganancias suman 1,
+      así que la mezcla no se sale de int16 y no hay que recortar.
+    - Sin NumPy o frames de otro tamaño: audioop (tres bytes por frame).
+
+    Solo la usa el hilo de audio.
+    """
+
+    __slots__ = ("_work", "_incoming", "_out")
+
+    def __init__(self):
+        if np is not None:
+            self._work = np.empty(FRAME_SAMPLES, dtype=np.float32)
+            self._incoming = np.empty(FRAME_SAMPLES, dtype=np.float32)
+            self._out = np.empty(FRAME_SAMPLES, dtype=np.int16)
+
+    def mix(self, outgoing: bytes, incoming: bytes, gain_in: float) -> bytes:
+        if np is None or len(outgoing) != FRAME_SAMPLES * 2:
+            return audioop.add(
+                audioop.mul(outgoing, 2, 1.0 - gain_in),
+                audioop.mul(incoming, 2, gain_in),
+                2,
+            )
+
+        work = self._work
+        np.multiply(
+            np.frombuffer(outgoing, dtype=np.int16), np.float32(1.0 - gain_in), out=work
+        )
+        np.multiply(
+            np.frombuffer(incoming, dtype=np.int16),
+            np.float32(gain_in),
+            out=self._incoming,
+        )
+        np.add(work, self._incoming, out=work)
+        out = self._out
+        np.copyto(out, work, casting="unsafe")
+        return out.tobytes()
@@ -0,0 +1,133 @@
+"""
+Pool de instancias yt_dlp.YoutubeDL reutilizables
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from config import Config
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+log = logging.getLogger("ydl_pool")
+
+
+def profile_options(profile: str) -> dict:
+    """
+    Opciones de yt-dlp para un perfil de Config.YDL_PROFILES.
+    Un valor None en el perfil elimina la opción base (p. ej. cookiefile).
+    """
+    opts = {**Config.YDL_OPTIONS, "skip_download": True, "extract_flat": False}
+    for key, value in Config.YDL_PROFILES[profile].items():
+        if value is None:
+            opts.pop(key, None)
+        else:
+            opts[key] = value
+    return opts
+
+
+class YDLPool:
+    """
+    Mantiene instancias de YoutubeDL ya construidas por perfil de opciones.
+
+    Construir un YoutubeDL carga los extractores y lee cookies.txt; con el
+    pool eso se paga una vez por instancia y no en cada búsqueda. Una
+    instancia solo la usa un hilo a la vez (checkout exclusivo).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: dict[str, list] = {name: [] for name in Config.YDL_PROFILES}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.constructed = 0
+        self.construct_time = 0.0
+        self.checkouts = 0
+        self.reused = 0
+        self.extractions = 0
+        self.extract_time = 0.0
+
+    def _construct(self, profile: str) -> "yt_dlp.YoutubeDL":
+        # Import diferido: yt_dlp tarda en importarse y no hace falta hasta
+        # la primera extracción (o el precalentamiento tras on_ready)
+        import yt_dlp
+
+        start = time.perf_counter()
+        ydl = yt_dlp.YoutubeDL(profile_options(profile))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.constructed += 1
+            self.construct_time += elapsed
+        return ydl
+
+    @contextmanager
+    def checkout(self, profile: str):
+        """Presta una instancia del perfil; se devuelve al pool al salir."""
+        with self._lock:
+            self.checkouts += 1
+            idle = self._idle[profile]
+            ydl = idle.pop() if idle else None
+            if ydl is not None:
+                self.reused += 1
+
+        if ydl is None:
+            ydl = self._construct(profile)
+
+        try:
+            yield ydl
+        finally:
+            with self._lock:
+                idle = self._idle[profile]
+                if len(idle) < self.size:
+                    idle.append(ydl)
+                    ydl = None
+            if ydl is not None:
+                ydl.close()
+
+    def extract(self, profile: str, url: str):
+        """extract_info bloqueante con una instancia del pool (para el executor)"""
+        with self.checkout(profile) as ydl:
+            start = time.perf_counter()
+            try:
+                return ydl.extract_info(url, download=False)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.extractions += 1
+                    self.extract_time += elapsed
+
+    def warm(self):
+        """Construye de antemano las instancias de los perfiles de uso habitual"""
+        for profile in Config.YDL_WARM_PROFILES:
+            missing = self.size - len(self._idle[profile])
+            built = [self._construct(profile) for _ in range(max(missing, 0))]
+            with self._lock:
+                self._idle[profile].extend(built)
+        log.info(f"Pool yt-dlp precalentado: {self.constructed} instancias")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": {name: len(idle) for name, idle in self._idle.items()},
+                "constructed": self.constructed,
+                "avg_construct_ms": (
+                    self.construct_time / self.constructed * 1000
+                    if self.constructed
+                    else 0.0
+                ),
+                "checkouts": self.checkouts,
+                "reused": self.reused,
+                "extractions": self.extractions,
+                "avg_extract_ms": (
+                    self.extract_time / self.extractions * 1000
+                    if self.extractions
+                    else 0.0
+                ),
+            }
+
+
+ydl_pool = YDLPool(Config.YDL_POOL_SIZE)
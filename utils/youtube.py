@@ -3,130 +3,896 @@ Utilidades para YouTube/yt-dlp
 """
 
 import logging
-import yt_dlp
+import re
+import time
 import discord
-import asyncio
 from typing import Optional, Dict
+from urllib.parse import urlparse, parse_qs
 from config import Config
+from utils.cache import TTLCache
+from utils.ydl_pool import ydl_pool
+from utils.scheduler import Priority, extraction_scheduler
+from utils.breaker import profile_breakers
+from utils.singleflight import SingleFlight
+from utils.audio_cache import CachingOpusAudio, CachingPCMAudio, audio_cache
+from utils.formats import describe, format_stats, select_audio_format
+from utils.loudness import LoudnessMeter, loudness_cache
+from utils.volume import VolumeStage
+from utils.filters import FilterChain
 
 log = logging.getLogger("youtube")
 
+# Resultados de búsqueda compartidos entre servidores
+search_cache = TTLCache(Config.SEARCH_CACHE_SIZE, Config.SEARCH_CACHE_TTL)
 
-class YTDLSource(discord.PCMVolumeTransformer):
-    """Fuente de audio extraída con yt-dlp"""
+# URLs de stream ya resueltas (clave normalizada → data de yt-dlp)
+stream_cache = TTLCache(Config.STREAM_CACHE_SIZE, 0)
 
-    def __init__(self, source, *, data, volume=0.5):
-        super().__init__(source, volume)
+# Extracciones en curso: peticiones simultáneas de la misma clave comparten una
+inflight = SingleFlight()
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_EXPIRE_PATH_RE = re.compile(r"/expire/(\d+)")
+
+# Errores de yt-dlp que hablan del video en sí: otro perfil no lo arregla
+_UNAVAILABLE_MARKERS = (
+    "video unavailable",
+    "private video",
+    "this video has been removed",
+    "this video is no longer available",
+    "account associated with this video has been terminated",
+)
+
+
+def is_unavailable_error(error: Exception) -> bool:
+    """True si el video no existe o es privado (no un bloqueo del perfil)"""
+    message = str(error).lower()
+    if "try again later" in message:  # "Video unavailable..." por límite de peticiones
+        return False
+    return any(marker in message for marker in _UNAVAILABLE_MARKERS)
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Devuelve el ID de video de una URL de YouTube, o None si no lo es."""
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www.") or host.startswith("m."):
+        host = host.split(".", 1)[1]
+
+    video_id = None
+    if host == "youtu.be":
+        video_id = parsed.path.lstrip("/").split("/")[0]
+    elif host in ("youtube.com", "music.youtube.com"):
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+        elif parsed.path.startswith(("/shorts/", "/embed/", "/live/")):
+            video_id = parsed.path.split("/")[2]
+
+    if video_id and _VIDEO_ID_RE.match(video_id):
+        return video_id
+    return None
+
+
+def extract_playlist_id(url: str) -> Optional[str]:
+    """
+    Devuelve el ID de lista si la URL es una playlist de YouTube
+    (youtube.com/playlist?list=...). Un link watch?v=...&list=... se sigue
+    tratando como una sola canción.
+    """
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www.") or host.startswith("m."):
+        host = host.split(".", 1)[1]
+    if host not in ("youtube.com", "music.youtube.com") or parsed.path != "/playlist":
+        return None
+
+    return parse_qs(parsed.query).get("list", [None])[0]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Clave de caché para una búsqueda:
+    - URLs de YouTube → "yt:<id>" (independiente de www/music/youtu.be)
+    - texto libre     → minúsculas con espacios colapsados
+    """
+    video_id = extract_video_id(query)
+    if video_id:
+        return f"yt:{video_id}"
+    if query.startswith("http"):
+        return query.strip()
+    return "q:" + " ".join(query.lower().split())
+
+
+def parse_stream_expiry(stream_url: str) -> Optional[float]:
+    """
+    Lee el parámetro expire (epoch en segundos) de una URL de googlevideo.
+    Admite tanto ?expire=... como el formato /expire/<ts>/ de los manifiestos.
+    """
+    try:
+        parsed = urlparse(stream_url)
+    except ValueError:
+        return None
+
+    value = parse_qs(parsed.query).get("expire", [None])[0]
+    if value is None:
+        match = _EXPIRE_PATH_RE.search(parsed.path)
+        value = match.group(1) if match else None
+
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# Campos de yt-dlp que usa el bot. El resto del info dict (subtítulos,
+# miniaturas, formatos de video...) suele pesar cientos de KB por video
+_INFO_FIELDS = (
+    "id",
+    "title",
+    "duration",
+    "thumbnail",
+    "webpage_url",
+    "original_url",
+    "url",
+    "format_id",
+    "acodec",
+    "vcodec",
+    "asr",
+    "abr",
+    "tbr",
+)
+_FORMAT_FIELDS = ("format_id", "url", "acodec", "vcodec", "asr", "abr", "tbr")
+
+
+def trim_info(data: dict) -> dict:
+    """
+    Copia de data con lo que necesitan las cachés, Song y la elección del
+    formato de audio: solo los formatos de audio (los de video si no hay
+    ninguno de solo audio) y solo sus campos de elección.
+    """
+    info = {key: data[key] for key in _INFO_FIELDS if key in data}
+    if "formats" in data:
+        audio = [
+            f
+            for f in data["formats"] or ()
+            if f.get("url") and f.get("acodec") not in (None, "none")
+        ]
+        audio_only = [f for f in audio if f.get("vcodec") in (None, "none")]
+        info["formats"] = [
+            {key: f[key] for key in _FORMAT_FIELDS if key in f}
+            for f in audio_only or audio
+        ]
+    return info
+
+
+def remember_stream(data: dict, url: Optional[str] = None):
+    """
+    Guarda la URL de stream resuelta en stream_cache hasta poco antes de que
+    expire. Se indexa por la URL pedida y por el ID del video.
+    """
+    try:
+        audio_url = YTDLSource._get_audio_url(data)
+    except (ValueError, KeyError):
+        return
+
+    expires = parse_stream_expiry(audio_url)
+    if expires is None:
+        return
+
+    # La URL tiene que seguir siendo válida durante toda la reproducción
+    # (FFmpeg reconecta con la misma URL si se corta)
+    margin = Config.STREAM_URL_MARGIN + (data.get("duration") or 0)
+    ttl = expires - time.time() - margin
+    if ttl <= 0:
+        return
+
+    keys = set()
+    if url:
+        keys.add(normalize_query(url))
+    for page_url in (data.get("webpage_url"), data.get("original_url")):
+        if page_url:
+            keys.add(normalize_query(page_url))
+    video_id = data.get("id")
+    if video_id and _VIDEO_ID_RE.match(video_id):
+        keys.add(f"yt:{video_id}")
+
+    for key in keys:
+        stream_cache.set(key, data, ttl=ttl)
+
+
+def cached_file_data(
+    video_id: str,
+    url: str,
+    path: str,
+    *,
+    title: Optional[str] = None,
+    duration: Optional[float] = None,
+) -> dict:
+    """
+    Datos equivalentes a los de yt-dlp para un archivo de la caché de disco.
+    El archivo no guarda título ni duración: los pone quien conoce la canción
+    (sin duración no hay gapless ni límite al buscar con !seek).
+    """
+    return {
+        "id": video_id,
+        "url": path,
+        "webpage_url": url,
+        "title": title,
+        "duration": duration,
+        "acodec": "opus",
+        "asr": 48000,
+    }
+
+
+def track_gain(data: dict) -> Optional[float]:
+    """Ganancia de normalización ya medida para el video (None = sin medir)"""
+    if not Config.LOUDNESS_NORMALIZE:
+        return None
+    return loudness_cache.gain(data.get("id"))
+
+
+def ffmpeg_options(
+    start: float = 0.0,
+    volume: Optional[float] = None,
+    local: bool = False,
+    filters: Optional[FilterChain] = None,
+) -> dict:
+    """
+    Opciones de FFmpeg para Config.FFMPEG_OPTIONS más:
+    - start: seek rápido de entrada (-ss antes de -i)
+    - volume: filtro de volumen dentro de FFmpeg (modo opus)
+    - local: la entrada es un archivo de la caché de disco (sin -reconnect)
+    - filters: filtros del servidor (van en el mismo -af que el volumen)
+    """
+    before = "-nostdin" if local else Config.FFMPEG_OPTIONS["before_options"]
+    options = Config.FFMPEG_OPTIONS["options"]
+    if start > 0:
+        before = f"-ss {start:.2f} {before}"
+    graph = [filters.graph] if filters else []
+    if volume is not None:
+        graph.append(f"volume={volume:.2f}")
+    if graph:
+        options = f"{options} -af {','.join(graph)}"
+    return {"before_options": before, "options": options}
+
+
+def swap_source(voice_client, source, *, loop):
+    """
+    Reemplaza la fuente que está sonando sin pasar por after_playing.
+    La fuente vieja se libera un momento después, cuando el hilo de audio
+    ya está leyendo de la nueva.
+    """
+    old = voice_client.source
+    paused = voice_client.is_paused()
+    voice_client.source = source
+    if paused:
+        voice_client.pause()
+    if old is not None and old is not source:
+        loop.call_later(0.5, old.cleanup)
+
+
+class _TrackMixin:
+    """Metadatos y posición de reproducción comunes a todas las fuentes"""
+
+    FRAME_SECONDS = 0.02  # cada read() entrega 20 ms de audio
+    EARLY_EOF = 2.0  # un fin de stream antes de esto es un corte, no el final
+
+    def _init_track(
+        self, data: dict, start: float, filters: Optional[FilterChain] = None
+    ):
         self.data = data
         self.title = data.get("title")
         self.url = data.get("url")
         self.duration = data.get("duration")
         self.thumbnail = data.get("thumbnail")
         self.webpage_url = data.get("webpage_url")
+        self.start = start
+        self.frames = 0
+        self.eof = False  # FFmpeg dejó de entregar audio (no cuenta un stop())
+        self.bitrate: Optional[int] = None  # kbps del canal al que va dirigida
+        self.format_info: Optional[dict] = None  # formato elegido y coste estimado
+        self.gain = 1.0  # normalización de sonoridad, aparte del volumen
+        self.filters = filters or FilterChain()
+        self.tempo = self.filters.tempo  # nightcore avanza 1.25 s por segundo
+
+    def _record_format(self, fmt: dict, bitrate: Optional[int], *, passthrough: bool):
+        self.bitrate = bitrate
+        self.format_info = describe(
+            fmt, target=bitrate, duration=self.duration, passthrough=passthrough
+        )
+        if self.start == 0:  # los reinicios (volumen, seek) no cuentan como pista
+            format_stats.record(self.format_info)
+            log.info(
+                f"Formato {self.format_info['format_id']} "
+                f"({self.format_info['acodec']} {self.format_info['abr'] or '?'}k) "
+                f"para {self.format_info['target_kbps']}k: "
+                f"{' → '.join(self.format_info['pipeline'])} | {self.title}"
+            )
+
+    @property
+    def position(self) -> float:
+        """Segundos de canción reproducidos (teniendo en cuenta el tempo)"""
+        return self.start + self.frames * self.FRAME_SECONDS * self.tempo
+
+    def stream_expired(self, margin: float = 30.0) -> bool:
+        """True si la URL de stream de googlevideo caduca en menos de margin s"""
+        expire = parse_stream_expiry(self.data.get("url") or "")
+        return expire is not None and expire - time.time() < margin
+
+    def ended_early(self) -> bool:
+        """
+        True si el stream se acabó a los pocos segundos de una canción de
+        duración conocida. Una URL de googlevideo caducada o rechazada falla
+        dentro de FFmpeg, que solo deja de entregar audio: para discord.py es
+        un final normal, sin error.
+        """
+        return (
+            self.eof
+            and bool(self.duration)
+            and self.frames * self.FRAME_SECONDS < self.EARLY_EOF
+            and self.duration - self.position > self.EARLY_EOF
+        )
+
+    def restart(
+        self,
+        *,
+        start: Optional[float] = None,
+        volume: Optional[float] = None,
+        data: Optional[dict] = None,
+        filters: Optional[FilterChain] = None,
+    ):
+        """
+        Nueva fuente sobre la misma URL de stream (sin yt-dlp), desde start
+        (por defecto la posición actual), con el volumen y los filtros dados
+        (por defecto los actuales). FFmpeg busca con -ss antes de -i, así que
+        solo pide el rango necesario. data reemplaza la URL de stream si la
+        anterior caducó.
+        """
+        return YTDLSource._build(
+            data or self.data,
+            volume=self.volume if volume is None else volume,
+            start=self.position if start is None else start,
+            bitrate=self.bitrate,
+            filters=self.filters if filters is None else filters,
+        )
+
+
+class YTDLSource(_TrackMixin, discord.PCMVolumeTransformer):
+    """
+    Fuente de audio extraída con yt-dlp (PCM; volumen aplicado en Python
+    con VolumeStage). Con LOUDNESS_NORMALIZE mide la sonoridad de las pistas
+    que aún no la tienen guardada.
+    """
+
+    live_volume = True  # el volumen se puede cambiar sin reiniciar FFmpeg
+
+    def __init__(
+        self,
+        source,
+        *,
+        data,
+        volume=0.5,
+        start: float = 0.0,
+        gain: Optional[float] = None,
+        filters: Optional[FilterChain] = None,
+    ):
+        super().__init__(source, volume)
+        self._init_track(data, start, filters)
+        self._stage = VolumeStage()
+        self._meter = None
+        if gain is not None:
+            self.gain = gain
+        elif (
+            Config.LOUDNESS_NORMALIZE and start == 0 and not filters and data.get("id")
+        ):
+            self._meter = LoudnessMeter()
+
+    def read(self) -> bytes:
+        ret = self.original.read()
+        if ret:
+            self.frames += 1
+            if self._meter is not None:
+                self._meter.add(ret)
+        else:
+            self.eof = True
+        return self._stage.apply(ret, min(self._volume, 2.0) * self.gain)
+
+    def cleanup(self) -> None:
+        super().cleanup()
+        meter, self._meter = self._meter, None
+        if meter is None:
+            return
+        # Canción entera o un tramo suficiente (las cortas, casi enteras)
+        needed = Config.LOUDNESS_MIN_SECONDS
+        if self.duration:
+            needed = min(needed, self.duration * 0.9)
+        if meter.seconds >= needed:
+            loudness = meter.loudness()
+            if loudness is not None:
+                loudness_cache.record(self.data["id"], loudness)
+
+    @classmethod
+    def _get_audio_format(cls, data: dict, bitrate: Optional[int] = None) -> dict:
+        """Elige el formato de audio para un canal de bitrate kbps"""
+        return select_audio_format(data, bitrate)
 
     @classmethod
     def _get_audio_url(cls, data: dict) -> str:
         """Extrae la mejor URL de audio del diccionario de datos de yt-dlp"""
-        if "url" in data:
-            return data["url"]
+        return cls._get_audio_format(data)["url"]
 
-        if "formats" in data:
-            audio_only = [
-                f
-                for f in data["formats"]
-                if f.get("acodec") != "none" and f.get("vcodec") == "none"
-            ]
-            if audio_only:
-                audio_only.sort(key=lambda f: f.get("abr") or 0, reverse=True)
-                return audio_only[0]["url"]
+    @classmethod
+    def _build(
+        cls,
+        data: dict,
+        *,
+        volume: float = 0.5,
+        start: float = 0.0,
+        bitrate: Optional[int] = None,
+        filters: Optional[FilterChain] = None,
+    ):
+        """
+        Lanza FFmpeg sobre la URL de audio ya resuelta en data, con el formato
+        adecuado al bitrate (kbps) del canal y los filtros del servidor. Si la
+        canción empieza desde el principio, sin filtros, y no está en la caché
+        de disco, FFmpeg además la va guardando ahí.
+        """
+        fmt = cls._get_audio_format(data, bitrate)
+        audio_url = fmt["url"]
+        local = not audio_url.startswith("http")
+        gain = track_gain(data)
+        pending = None
+        if start == 0 and not local and not filters:
+            pending = audio_cache.begin(data.get("id"))
 
-            with_audio = [f for f in data["formats"] if f.get("acodec") != "none"]
-            if with_audio:
-                return with_audio[0]["url"]
+        try:
+            if Config.AUDIO_MODE == "opus":
+                return YTDLOpusSource.from_data(
+                    data,
+                    fmt,
+                    volume=volume,
+                    start=start,
+                    pending=pending,
+                    bitrate=bitrate,
+                    gain=gain,
+                    filters=filters,
+                )
 
-            return data["formats"][0]["url"]
+            options = ffmpeg_options(start, local=local, filters=filters)
+            if pending is not None:
+                original = CachingPCMAudio(
+                    audio_url,
+                    pending=pending,
+                    copy=fmt.get("acodec") == "opus",
+                    **options,
+                )
+            else:
+                original = discord.FFmpegPCMAudio(
+                    audio_url, executable=Config.FFMPEG_PATH, **options
+                )
+        except Exception:
+            if pending is not None:
+                audio_cache.abort(pending)
+            raise
 
-        raise ValueError("No se pudo obtener URL de audio del resultado de yt-dlp")
+        source = cls(
+            original,
+            data=data,
+            volume=volume,
+            start=start,
+            gain=gain,
+            filters=filters,
+        )
+        source._record_format(fmt, bitrate, passthrough=False)
+        return source
 
     @classmethod
-    async def from_url(cls, url: str, *, loop=None, stream=True):
-        """Crea una fuente de audio FFmpeg a partir de una URL directa"""
-        loop = loop or asyncio.get_event_loop()
-        opts = {**Config.YDL_OPTIONS, "skip_download": True}
+    async def resolve(
+        cls,
+        url: str,
+        *,
+        guild_id: Optional[int] = None,
+        priority: Priority = Priority.PLAY_NOW,
+    ) -> dict:
+        """
+        Devuelve los datos de yt-dlp con la URL de stream resuelta.
+        Si ya fue resuelta y no ha expirado se usa stream_cache sin llamar a yt-dlp.
+        Resoluciones simultáneas de la misma URL comparten una sola extracción,
+        que sube a la prioridad más alta de quienes la esperan.
+        """
+        key = normalize_query(url)
+        cached = stream_cache.get(key)
+        if cached:
+            return cached
+
+        flight = ("resolve", key)
+        extraction_scheduler.promote(flight, priority)
+        return await inflight.do(
+            flight, lambda: cls._extract(url, guild_id, priority, flight)
+        )
 
+    @staticmethod
+    def promote(url: str, priority: Priority = Priority.PLAY_NOW) -> int:
+        """Sube a priority la resolución de url si espera turno más abajo"""
+        return extraction_scheduler.promote(("resolve", normalize_query(url)), priority)
+
+    @classmethod
+    async def _extract(
+        cls, url: str, guild_id: Optional[int], priority: Priority, flight: tuple
+    ) -> dict:
+        """Extracción real con yt-dlp; guarda la URL de stream en caché"""
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                data = await loop.run_in_executor(
-                    None, lambda: ydl.extract_info(url, download=False)
+            data = await cls._extract_any(url, guild_id, priority, flight)
+        except Exception as e:
+            log.error(f"resolve falló ({url}): {e}")
+            raise
+
+        if not data:
+            raise ValueError("yt-dlp no devolvió datos para la URL")
+
+        if "entries" in data:
+            data = data["entries"][0]
+
+        data = trim_info(data)
+        remember_stream(data, url)
+        return data
+
+    @staticmethod
+    async def _extract_any(
+        url: str,
+        guild_id: Optional[int],
+        priority: Priority,
+        flight: Optional[tuple] = None,
+    ):
+        """
+        extract_info probando los perfiles de Config.EXTRACT_PROFILES en orden
+        y saltando los que tienen el circuito abierto. Un fallo solo cuenta
+        contra un perfil si otro resuelve la misma petición: si fallan todos,
+        el problema es del video y no de las cookies o del cliente. Si el
+        error ya dice que el video no está disponible (privado, borrado) no
+        se prueba ningún perfil más. flight es la clave con la que
+        ExtractionScheduler.promote puede subir la extracción.
+        """
+        failed = []
+        error = None
+        for profile in profile_breakers.candidates(Config.EXTRACT_PROFILES):
+            try:
+                data = await extraction_scheduler.run(
+                    ydl_pool.extract,
+                    profile,
+                    url,
+                    guild_id=guild_id,
+                    priority=priority,
+                    key=flight,
                 )
+            except Exception as e:
+                log.warning(f"Extracción con perfil {profile} falló: {e}")
+                failed.append(profile)
+                error = e
+                if is_unavailable_error(e):
+                    break
+                continue
 
-                if not data:
-                    raise ValueError("yt-dlp no devolvió datos para la URL")
+            profile_breakers.get(profile).success()
+            for name in failed:
+                profile_breakers.get(name).failure()
+            return data
 
-                if "entries" in data:
-                    data = data["entries"][0]
+        for name in failed:
+            profile_breakers.get(name).release()
+        raise error
 
-                audio_url = cls._get_audio_url(data)
+    @classmethod
+    async def from_url(
+        cls,
+        url: str,
+        *,
+        stream=True,
+        volume: float = Config.DEFAULT_VOLUME,
+        guild_id: Optional[int] = None,
+        priority: Priority = Priority.PLAY_NOW,
+        bitrate: Optional[int] = None,
+        filters: Optional[FilterChain] = None,
+        title: Optional[str] = None,
+        duration: Optional[float] = None,
+    ):
+        """
+        Crea una fuente de audio FFmpeg a partir de una URL, para un canal de
+        bitrate kbps y con los filtros del servidor.
+        Si la canción está en la caché de disco se reproduce desde ahí, sin
+        red ni yt-dlp; title y duration (los de la Song) completan sus datos.
+        Si la URL de stream en caché falla al lanzar FFmpeg, se descarta y se
+        vuelve a extraer con yt-dlp.
+        """
+        video_id = extract_video_id(url)
+        path = audio_cache.get(video_id)
+        if path:
+            return cls._build(
+                cached_file_data(video_id, url, path, title=title, duration=duration),
+                volume=volume,
+                bitrate=bitrate,
+                filters=filters,
+            )
 
-                return cls(
-                    discord.FFmpegPCMAudio(
-                        audio_url,
-                        executable=Config.FFMPEG_PATH,
-                        **Config.FFMPEG_OPTIONS,
-                    ),
-                    data=data,
+        key = normalize_query(url)
+        if key in stream_cache:
+            try:
+                return cls._build(
+                    stream_cache.get(key),
+                    volume=volume,
+                    bitrate=bitrate,
+                    filters=filters,
                 )
+            except Exception as e:
+                log.warning(f"URL de stream en caché inválida ({url}): {e}")
+                cls.invalidate(url)
+
+        try:
+            data = await cls.resolve(url, guild_id=guild_id, priority=priority)
+            return cls._build(data, volume=volume, bitrate=bitrate, filters=filters)
         except Exception as e:
             log.error(f"from_url falló ({url}): {e}")
             raise
 
+    @staticmethod
+    def invalidate(url: str):
+        """
+        Descarta la URL de stream guardada (p. ej. tras un 403 de googlevideo)
+        y el archivo de la caché de disco, por si era ese el que falló.
+        """
+        stream_cache.pop(normalize_query(url))
+        audio_cache.remove(extract_video_id(url))
+
     @classmethod
-    async def search(cls, query: str, *, loop=None) -> Optional[Dict]:
+    async def search(
+        cls,
+        query: str,
+        *,
+        guild_id: Optional[int] = None,
+        priority: Priority = Priority.ENQUEUE,
+    ) -> Optional[Dict]:
         """
         Busca en YouTube y devuelve la información de la primera coincidencia.
-        Primero intenta con cookies; si falla, reintenta sin ellas.
+        Los resultados se guardan en search_cache por query normalizada e ID,
+        y búsquedas simultáneas de la misma clave comparten una sola extracción.
+        Los perfiles de yt-dlp que fallan de forma repetida (cookies caducadas,
+        cliente bloqueado) se saltan durante un tiempo (ver _extract_any).
         """
-        loop = loop or asyncio.get_event_loop()
+        key = normalize_query(query)
+        cached = search_cache.get(key)
+        if cached:
+            log.info(f"Búsqueda en caché: {key}")
+            return cached
+
+        flight = ("search", key)
+        extraction_scheduler.promote(flight, priority)
+        return await inflight.do(
+            flight, lambda: cls._search_and_cache(query, key, guild_id, priority)
+        )
+
+    @classmethod
+    async def _search_and_cache(
+        cls, query: str, key: str, guild_id: Optional[int], priority: Priority
+    ) -> Optional[Dict]:
+        result = await cls._search_uncached(query, guild_id, priority, ("search", key))
+        if result:
+            result = trim_info(result)
+            search_cache.set(key, result)
+            # También indexar por ID para que pegar el link reutilice el resultado
+            video_id = result.get("id")
+            if video_id and _VIDEO_ID_RE.match(video_id):
+                search_cache.set(f"yt:{video_id}", result)
+            remember_stream(result)
+        return result
 
+    @classmethod
+    async def _search_uncached(
+        cls,
+        query: str,
+        guild_id: Optional[int],
+        priority: Priority,
+        flight: Optional[tuple] = None,
+    ) -> Optional[Dict]:
+        """Búsqueda real contra yt-dlp"""
         # Normalizar URLs de YouTube Music a YouTube estándar
         if "music.youtube.com" in query:
             query = query.replace("music.youtube.com", "www.youtube.com")
             if "&list=" in query:
                 query = query.split("&list=")[0]
 
-        opts = {**Config.YDL_OPTIONS, "skip_download": True, "extract_flat": False}
-
-        result = await cls._do_search(query, opts, loop)
-        if result:
-            return result
-
-        # Segunda oportunidad sin cookies
-        log.info("Reintentando búsqueda sin cookies...")
-        opts_no_cookies = {k: v for k, v in opts.items() if k != "cookiefile"}
-        return await cls._do_search(query, opts_no_cookies, loop)
+        return await cls._do_search(query, guild_id, priority, flight)
 
     @classmethod
-    async def _do_search(cls, query: str, opts: dict, loop) -> Optional[Dict]:
-        """Ejecuta la búsqueda con las opciones dadas"""
+    async def _do_search(
+        cls,
+        query: str,
+        guild_id: Optional[int],
+        priority: Priority,
+        flight: Optional[tuple] = None,
+    ) -> Optional[Dict]:
+        """Ejecuta la búsqueda con el primer perfil sano del pool"""
+        search_query = query if query.startswith("http") else f"ytsearch:{query}"
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                search_query = (
-                    query if query.startswith("http") else f"ytsearch:{query}"
-                )
-
-                data = await loop.run_in_executor(
-                    None, lambda: ydl.extract_info(search_query, download=False)
-                )
+            data = await cls._extract_any(search_query, guild_id, priority, flight)
 
-                if not data:
-                    return None
+            if not data:
+                return None
 
-                if "entries" in data:
-                    entries = [e for e in data["entries"] if e]
-                    return entries[0] if entries else None
+            if "entries" in data:
+                entries = [e for e in data["entries"] if e]
+                return entries[0] if entries else None
 
-                return data
+            return data
 
         except Exception as e:
             log.error(f"Búsqueda falló ({query!r}): {e}")
             return None
+
+    @classmethod
+    async def playlist(
+        cls,
+        url: str,
+        *,
+        limit: int,
+        guild_id: Optional[int] = None,
+        priority: Priority = Priority.ENQUEUE,
+    ) -> Optional[Dict]:
+        """
+        Lista las canciones de una playlist con una sola petición plana
+        (extract_flat): no resuelve ningún stream. Devuelve
+        {"title": ..., "entries": [dict ligero por canción]} con como mucho
+        limit entradas, o None si falla.
+        """
+        playlist_id = extract_playlist_id(url)
+        if not playlist_id or limit <= 0:
+            return None
+
+        return await inflight.do(
+            ("playlist", playlist_id, limit),
+            lambda: cls._flat_playlist(playlist_id, limit, guild_id, priority),
+        )
+
+    @classmethod
+    async def _flat_playlist(
+        cls, playlist_id: str, limit: int, guild_id: Optional[int], priority: Priority
+    ) -> Optional[Dict]:
+        playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
+        try:
+            data = await extraction_scheduler.run(
+                ydl_pool.extract,
+                "playlist",
+                playlist_url,
+                guild_id=guild_id,
+                priority=priority,
+            )
+        except Exception as e:
+            log.error(f"Playlist falló ({playlist_id}): {e}")
+            return None
+
+        if not data:
+            return None
+
+        entries = []
+        for entry in data.get("entries") or []:
+            if len(entries) >= limit:
+                break
+            video_id = entry.get("id") if entry else None
+            if not video_id or not _VIDEO_ID_RE.match(video_id):
+                continue  # videos privados/eliminados
+            thumbnails = entry.get("thumbnails") or []
+            entries.append(
+                {
+                    "id": video_id,
+                    "url": f"https://www.youtube.com/watch?v={video_id}",
+                    "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+                    "title": entry.get("title") or "Sin título",
+                    "duration": entry.get("duration") or 0,
+                    "thumbnail": thumbnails[-1].get("url") if thumbnails else None,
+                }
+            )
+
+        return {"title": data.get("title") or "Playlist", "entries": entries}
+
+
+class YTDLOpusSource(_TrackMixin, discord.AudioSource):
+    """
+    Fuente que entrega paquetes Opus ya codificados: discord.py los envía
+    tal cual, sin decodificar a PCM ni recodificar en este proceso.
+
+    - Si el stream ya es Opus a 48 kHz y el volumen es 100 %, FFmpeg solo
+      copia los paquetes (-c:a copy).
+    - Con otro volumen o con filtros, FFmpeg los aplica y codifica a Opus él
+      mismo. Cambiar el volumen exige reiniciar FFmpeg en la posición actual.
+    """
+
+    live_volume = False
+
+    def __init__(
+        self,
+        original,
+        *,
+        data,
+        volume=1.0,
+        start: float = 0.0,
+        copy=False,
+        filters: Optional[FilterChain] = None,
+    ):
+        self.original = original
+        self._init_track(data, start, filters)
+        self.volume = volume
+        self.passthrough = copy
+
+    @classmethod
+    def from_data(
+        cls,
+        data: dict,
+        fmt: dict,
+        *,
+        volume: float = 1.0,
+        start: float = 0.0,
+        pending=None,
+        bitrate: Optional[int] = None,
+        gain: Optional[float] = None,
+        filters: Optional[FilterChain] = None,
+    ):
+        audio_url = fmt["url"]
+        is_opus = fmt.get("acodec") == "opus" and fmt.get("asr") in (48000, None)
+        level = volume * (gain or 1.0)  # sin PCM aquí no se mide, solo se aplica
+        copy = is_opus and abs(level - 1.0) < 0.005 and not filters
+        options = ffmpeg_options(
+            start,
+            None if copy else level,
+            local=not audio_url.startswith("http"),
+            filters=filters,
+        )
+
+        if pending is not None:
+            original = CachingOpusAudio(
+                audio_url,
+                pending=pending,
+                copy=is_opus,
+                pipe_copy=copy,
+                bitrate=bitrate,
+                **options,
+            )
+        else:
+            original = discord.FFmpegOpusAudio(
+                audio_url,
+                codec="copy" if copy else None,
+                bitrate=bitrate,
+                executable=Config.FFMPEG_PATH,
+                **options,
+            )
+        source = cls(
+            original,
+            data=data,
+            volume=volume,
+            start=start,
+            copy=copy,
+            filters=filters,
+        )
+        source.gain = gain or 1.0
+        source._record_format(fmt, bitrate, passthrough=copy)
+        return source
+
+    def read(self) -> bytes:
+        ret = self.original.read()
+        if ret:
+            self.frames += 1
+        else:
+            self.eof = True
+        return ret
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        self.original.cleanup()